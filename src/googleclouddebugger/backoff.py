@@ -11,7 +11,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Implements exponential backoff for retry timeouts."""
+"""Implements exponential and slotted backoff for retry timeouts."""
+
+import random
 
 
 class Backoff(object):
@@ -22,23 +24,34 @@ class Backoff(object):
   subsequent failures, up to the specified maximum. Once the request succeeds
   once, the delay is reset to minimum.
 
+  The returned delay is picked uniformly between zero and the current delay
+  ("full jitter"). This way agents that failed at the same time (e.g. due to a
+  backend outage) don't all retry at the same time again.
+
   Attributes:
     min_interval_sec: initial small delay.
     max_interval_sec: maximum delay between retries.
     multiplier: factor for exponential increase.
   """
 
-  def __init__(self, min_interval_sec=10, max_interval_sec=600, multiplier=2):
+  def __init__(self,
+               min_interval_sec=10,
+               max_interval_sec=600,
+               multiplier=2,
+               rng=None):
     """Class constructor.
 
     Args:
       min_interval_sec: initial small delay.
       max_interval_sec: maximum delay between retries.
       multiplier: factor for exponential increase.
+      rng: random.Random instance used to pick the delays. Tests can pass a
+          seeded one.
     """
     self.min_interval_sec = min_interval_sec
     self.max_interval_sec = max_interval_sec
     self.multiplier = multiplier
+    self._rng = rng or random.Random()
     self.Succeeded()
 
   def Succeeded(self):
@@ -51,7 +64,49 @@ class Backoff(object):
     Returns:
       Time interval to wait before retrying (in seconds).
     """
-    interval = self._current_interval_sec
+    interval = self._rng.uniform(0, self._current_interval_sec)
     self._current_interval_sec = min(
         self.max_interval_sec, self._current_interval_sec * self.multiplier)
     return interval
+
+
+class SlotBackoff(object):
+  """Randomized slotted backoff for retry timeouts.
+
+  The delay is a whole number of time slots picked at random. The number of
+  slots to pick from doubles with every subsequent failure, up to the specified
+  maximum, and is reset once the request succeeds. Unlike Backoff, a request
+  that keeps failing may still be retried right away, while concurrent
+  requests are spread across the slots.
+
+  Attributes:
+    slot_sec: duration of a single slot.
+    max_slots: maximum number of slots to pick from.
+  """
+
+  def __init__(self, slot_sec=1, max_slots=64, rng=None):
+    """Class constructor.
+
+    Args:
+      slot_sec: duration of a single slot.
+      max_slots: maximum number of slots to pick from.
+      rng: random.Random instance used to pick the slots. Tests can pass a
+          seeded one.
+    """
+    self.slot_sec = slot_sec
+    self.max_slots = max_slots
+    self._rng = rng or random.Random()
+    self.Succeeded()
+
+  def Succeeded(self):
+    """Resets the number of slots upon request success."""
+    self._slots = 1
+
+  def Failed(self):
+    """Indicates that a request has failed.
+
+    Returns:
+      Time interval to wait before retrying (in seconds).
+    """
+    self._slots = min(self.max_slots, self._slots * 2)
+    return self._rng.randrange(self._slots) * self.slot_sec
@@ -14,6 +14,7 @@
 """Manages lifetime of individual breakpoint objects."""
 
 from datetime import datetime
+import heapq
 from threading import RLock
 
 from . import python_breakpoint
@@ -54,8 +55,10 @@ class BreakpointsManager(object):
     # Map of active breakpoints. The key is breakpoint ID.
     self._active = {}
 
-    # Closest expiration of all active breakpoints or past time if not known.
-    self._next_expiration = datetime.max
+    # Heap of (expiration time, breakpoint ID) tuples of active breakpoints.
+    # Entries of breakpoints that are no longer active are only dropped once
+    # they expire.
+    self._expirations = []
 
   def SetActiveBreakpoints(self, breakpoints_data):
     """Adds new breakpoints and removes missing ones.
@@ -71,13 +74,15 @@ class BreakpointsManager(object):
         self._active.pop(breakpoint_id).Clear()
 
       # Create new breakpoints.
-      self._active.update([
-          (x['id'],
-           python_breakpoint.PythonBreakpoint(x, self._hub_client, self,
-                                              self.data_visibility_policy))
-          for x in breakpoints_data
-          if x['id'] in ids - self._active.keys() - self._completed
-      ])
+      new_ids = ids - self._active.keys() - self._completed
+      if new_ids:
+        for x in breakpoints_data:
+          if x['id'] in new_ids:
+            breakpoint = python_breakpoint.PythonBreakpoint(
+                x, self._hub_client, self, self.data_visibility_policy)
+            self._active[x['id']] = breakpoint
+            heapq.heappush(self._expirations,
+                           (breakpoint.GetExpirationTime(), x['id']))
 
       # Remove entries from completed_breakpoints_ that weren't listed in
       # breakpoints_data vector. These are confirmed to have been removed by the
@@ -85,11 +90,6 @@ class BreakpointsManager(object):
       # again. The backend never reuses breakpoint IDs.
       self._completed &= ids
 
-      if self._active:
-        self._next_expiration = datetime.min  # Not known.
-      else:
-        self._next_expiration = datetime.max  # Nothing to expire.
-
   def CompleteBreakpoint(self, breakpoint_id):
     """Marks the specified breaking as completed.
 
@@ -107,17 +107,14 @@ class BreakpointsManager(object):
     """Completes all breakpoints that have been active for too long."""
     with self._lock:
       current_time = BreakpointsManager.GetCurrentTime()
-      if self._next_expiration > current_time:
-        return
 
       expired_breakpoints = []
-      self._next_expiration = datetime.max
-      for breakpoint in self._active.values():
-        expiration_time = breakpoint.GetExpirationTime()
-        if expiration_time <= current_time:
+      expirations = self._expirations
+      while expirations and expirations[0][0] <= current_time:
+        _, breakpoint_id = heapq.heappop(expirations)
+        breakpoint = self._active.get(breakpoint_id)
+        if breakpoint is not None:
           expired_breakpoints.append(breakpoint)
-        else:
-          self._next_expiration = min(self._next_expiration, expiration_time)
 
     for breakpoint in expired_breakpoints:
       breakpoint.ExpireBreakpoint()
@@ -15,6 +15,7 @@
 
 import copy
 import datetime
+import functools
 import inspect
 import itertools
 import logging
@@ -891,6 +892,27 @@ class LogCollector(object):
     return str(type(value))
 
 
+@functools.lru_cache(maxsize=256)
+def _CompileExpression(expression):
+  """Compiles watched expression.
+
+  Logpoints evaluate their expressions on every hit, so the compiled code (or
+  the compilation error) is cached by the expression string.
+
+  Args:
+    expression: watched expression to compile.
+
+  Returns:
+    (code, error) tuple. code is the compiled code object or None if the
+    compilation failed, in which case error is the raised exception.
+  """
+  try:
+    return compile(expression, '<watched_expression>', 'eval'), None
+  except (TypeError, ValueError, SyntaxError) as e:
+    # Don't keep the compilation frames alive in the cache.
+    return None, e.with_traceback(None)
+
+
 def _EvaluateExpression(frame, expression):
   """Compiles and evaluates watched expression.
 
@@ -901,25 +923,24 @@ def _EvaluateExpression(frame, expression):
   Returns:
     (False, status) on error or (True, value) on success.
   """
-  try:
-    code = compile(expression, '<watched_expression>', 'eval')
-  except (TypeError, ValueError) as e:
-    # expression string contains null bytes.
+  code, error = _CompileExpression(expression)
+  if isinstance(error, SyntaxError):
     return (False, {
         'isError': True,
         'refersTo': 'VARIABLE_NAME',
         'description': {
-            'format': 'Invalid expression',
-            'parameters': [str(e)]
+            'format': 'Expression could not be compiled: $0',
+            'parameters': [error.msg]
         }
     })
-  except SyntaxError as e:
+  if error is not None:
+    # expression string contains null bytes.
     return (False, {
         'isError': True,
         'refersTo': 'VARIABLE_NAME',
         'description': {
-            'format': 'Expression could not be compiled: $0',
-            'parameters': [e.msg]
+            'format': 'Invalid expression',
+            'parameters': [str(error)]
         }
     })
 
@@ -88,7 +88,13 @@ class FirebaseClient(object):
   worker thread is marked as daemon.
   """
 
-  def __init__(self):
+  def __init__(self, backoff_factory=backoff.Backoff):
+    """Class constructor.
+
+    Args:
+      backoff_factory: callable that returns a new retry backoff strategy, such
+          as backoff.Backoff (default) or backoff.SlotBackoff.
+    """
     self.on_active_breakpoints_changed = lambda x: None
     self.on_idle = lambda: None
     self._debuggee_labels = {}
@@ -118,10 +124,10 @@ class FirebaseClient(object):
     #
 
     # Delay before retrying failed request.
-    self.connect_backoff = backoff.Backoff()  # Connect to the DB.
-    self.register_backoff = backoff.Backoff()  # Register debuggee.
-    self.subscribe_backoff = backoff.Backoff()  # Subscribe to updates.
-    self.update_backoff = backoff.Backoff()  # Update breakpoint.
+    self.connect_backoff = backoff_factory()  # Connect to the DB.
+    self.register_backoff = backoff_factory()  # Register debuggee.
+    self.subscribe_backoff = backoff_factory()  # Subscribe to updates.
+    self.update_backoff = backoff_factory()  # Update breakpoint.
 
     # Maximum number of times that the message is re-transmitted before it
     # is assumed to be poisonous and discarded
@@ -271,16 +277,27 @@ class FirebaseClient(object):
     Args:
       breakpoint: breakpoint in either final or non-final state.
     """
-    with self._transmission_thread_startup_lock:
-      if self._transmission_thread is None:
-        self._transmission_thread = threading.Thread(
-            target=self._TransmissionThreadProc)
-        self._transmission_thread.name = 'Cloud Debugger transmission thread'
-        self._transmission_thread.daemon = True
-        self._transmission_thread.start()
+    # The transmission thread is only started once, so skip the lock after it
+    # is running.
+    if self._transmission_thread is None:
+      with self._transmission_thread_startup_lock:
+        if self._transmission_thread is None:
+          transmission_thread = threading.Thread(
+              target=self._TransmissionThreadProc)
+          transmission_thread.name = 'Cloud Debugger transmission thread'
+          transmission_thread.daemon = True
+          transmission_thread.start()
+          self._transmission_thread = transmission_thread
 
     self._transmission_queue.append((breakpoint_data, 0))
-    self._new_updates.set()  # Wake up the worker thread to send immediately.
+
+    # Wake up the worker thread to send immediately. When many breakpoints
+    # complete at once (e.g. on expiration), the worker is already signaled and
+    # will pick up all pending updates in a single pass, so skip the lock taken
+    # by Event.set(). The worker clears the event before draining the queue, so
+    # an update appended before this check is never missed.
+    if not self._new_updates.is_set():
+      self._new_updates.set()
 
   def _MainThreadProc(self):
     """Entry point for the worker thread.
@@ -112,5 +112,16 @@ void LeakyBucket::TakeTokens(int64_t tokens) {
   }
 }
 
+bool LeakyBucket::IsFullyRecovered() {
+  const int64_t current_time_ns = NowInNanoseconds();
+
+  std::lock_guard<std::mutex> lock(mu_);
+
+  // RefillBucket never adds more than "capacity_" tokens at once, so waiting
+  // any longer than this makes no difference.
+  const int64_t elapsed_ns = current_time_ns - fill_time_ns_;
+  return elapsed_ns * (fill_rate_ / 1e9) >= capacity_;
+}
+
 }  // namespace cdbg
 }  // namespace devtools
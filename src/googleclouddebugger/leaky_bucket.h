@@ -53,6 +53,11 @@ class LeakyBucket {
   // bucket negative.
   void TakeTokens(int64_t tokens);
 
+  // Returns true once a full "capacity_" worth of tokens accumulated since the
+  // last refill. At that point the bucket is in the same state as after an
+  // arbitrarily long idle period. Does not modify the bucket.
+  bool IsFullyRecovered();
+
  private:
   // The slow path of RequestTokens. Grabs a lock and may refill tokens_
   // using the fill rate and time passed since last fill.
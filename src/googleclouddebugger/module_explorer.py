@@ -158,6 +158,10 @@ def _FindCodeObjectsReferents(module, start_objects, visit_recorder):
   Returns:
     List of code objects.
   """
+  # If the module was precompiled, the code object may point to .py file, while
+  # the module says that it originated from .pyc file. We just strip extension
+  # altogether to work around it.
+  module_file = os.path.splitext(module.__file__)[0]
 
   def CheckIgnoreCodeObject(code_object):
     """Checks if the code object can be ignored.
@@ -165,10 +169,6 @@ def _FindCodeObjectsReferents(module, start_objects, visit_recorder):
     Code objects that are not implemented in the module, or are from a lambda or
     generator expression can be ignored.
 
-    If the module was precompiled, the code object may point to .py file, while
-    the module says that it originated from .pyc file. We just strip extension
-    altogether to work around it.
-
     Args:
       code_object: code object that we want to check against module.
 
@@ -179,7 +179,6 @@ def _FindCodeObjectsReferents(module, start_objects, visit_recorder):
       return True
 
     code_object_file = os.path.splitext(code_object.co_filename)[0]
-    module_file = os.path.splitext(module.__file__)[0]
 
     # The simple case.
     if code_object_file == module_file:
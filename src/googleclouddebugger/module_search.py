@@ -16,6 +16,10 @@
 import os
 import sys
 
+# Module file extensions probed for every search candidate. The order in which
+# we search the extensions does not matter.
+_MODULE_EXTENSIONS = ('.pyo', '.pyc', '.py')
+
 
 def Search(path):
   """Search sys.path to find a source file that matches path.
@@ -81,19 +85,21 @@ def Search(path):
   src_root, src_ext = os.path.splitext(path)
   assert src_ext == '.py'
 
+  exists = os.path.exists
+  join = os.path.join
+
   # Search longer suffixes first. Move to shorter suffixes only if longer
   # suffixes do not result in any matches.
   for src_part in SearchCandidates(src_root):
     # Search is done in sys.path order, which gives higher priority to earlier
     # entries in sys.path list.
     for sys_path in sys.path:
-      f = os.path.join(sys_path, src_part)
-      # The order in which we search the extensions does not matter.
-      for ext in ('.pyo', '.pyc', '.py'):
+      f = join(sys_path, src_part)
+      for ext in _MODULE_EXTENSIONS:
         # The os.path.exists check internally follows symlinks and flattens
         # relative paths, so we don't have to deal with it.
         fext = f + ext
-        if os.path.exists(fext):
+        if exists(fext):
           # Once we identify a matching file in the filesystem, we should
           # preserve the (1) potentially-symlinked and (2)
           # potentially-non-flattened file path (f+ext), because that's exactly
@@ -16,6 +16,14 @@
 import os
 import sys
 
+# Snapshot of (module name, module file, file path without extension) tuples
+# for all loaded modules that have a file. The snapshot is keyed by the
+# identity and size of sys.modules and is rebuilt whenever either changes. It
+# holds module names rather than the modules themselves, so that removed
+# modules can be garbage collected.
+_modules_snapshot = (None, ())
+
+
 def NormalizePath(path):
   """Normalizes a path.
 
@@ -74,27 +82,87 @@ def GetLoadedModuleBySuffix(path):
     found.
   """
   root = os.path.splitext(path)[0]
-  for module in sys.modules.values():
-    mod_root = os.path.splitext(getattr(module, '__file__', None) or '')[0]
+  entries, fresh = _GetLoadedModuleRoots()
+  module = _FindModuleByRoot(entries, root)
+
+  # The snapshot is only invalidated when sys.modules changes size. Modules
+  # could have been removed, added or replaced in the meantime without changing
+  # the size. _FindModuleByRoot doesn't report matches that no longer exist,
+  # but a miss needs to be confirmed against fresh data.
+  if module is None and not fresh:
+    module = _FindModuleByRoot(_GetLoadedModuleRoots(rebuild=True)[0], root)
+
+  return module
 
+
+def _GetLoadedModuleRoots(rebuild=False):
+  """Returns the cached snapshot of loaded module files.
+
+  Args:
+    rebuild: if True, the snapshot is recomputed even if sys.modules appears
+        unchanged.
+
+  Returns:
+    (entries, fresh) tuple. entries is a tuple of (name, file, root) tuples,
+    where name is the key of the module in sys.modules, file is its __file__
+    and root is file without extension (normalized if absolute). fresh is True
+    if the snapshot was rebuilt by this call.
+  """
+  global _modules_snapshot
+
+  key = (id(sys.modules), len(sys.modules))
+  snapshot_key, entries = _modules_snapshot
+  if not rebuild and snapshot_key == key:
+    return entries, False
+
+  entries = []
+  for name, module in list(sys.modules.items()):
+    mod_file = getattr(module, '__file__', None)
+    mod_root = os.path.splitext(mod_file or '')[0]
     if not mod_root:
       continue
 
+    # In the following invocation 'python3 ./main.py' (using the ./), the
+    # mod_root variable will '/base/path/./main'. In order to correctly compare
+    # it with the root variable, it needs to be '/base/path/main'. Absolute
+    # paths don't depend on the current directory, so they are normalized once
+    # here rather than on every lookup.
+    if os.path.isabs(mod_root):
+      mod_root = NormalizePath(mod_root)
+    entries.append((name, mod_file, mod_root))
+  entries = tuple(entries)
+  _modules_snapshot = (key, entries)
+
+  return entries, True
+
+
+def _FindModuleByRoot(entries, root):
+  """Returns the first loaded module in entries whose file matches root.
+
+  Entries whose module is no longer in sys.modules (or was replaced by a
+  module with a different file) are skipped.
+
+  Args:
+    entries: tuple of (name, file, root) tuples from _GetLoadedModuleRoots.
+    root: path to look for, without extension.
+
+  Returns:
+    The matching module or None.
+  """
+  for name, mod_file, mod_root in entries:
     # While mod_root can contain symlinks, we cannot eliminate them. This is
     # because, we must perform exactly the same transformations on mod_root and
     # path, yet path can be relative to an unknown directory which prevents
     # identifying and eliminating symbolic links.
     #
-    # Therefore, we only convert relative to absolute path.
+    # Therefore, we only convert relative to absolute path. Absolute paths
+    # were already normalized by _GetLoadedModuleRoots.
     if not os.path.isabs(mod_root):
-      mod_root = os.path.join(os.getcwd(), mod_root)
-
-    # In the following invocation 'python3 ./main.py' (using the ./), the
-    # mod_root variable will '/base/path/./main'. In order to correctly compare
-    # it with the root variable, it needs to be '/base/path/main'.
-    mod_root = NormalizePath(mod_root)
+      mod_root = NormalizePath(os.path.join(os.getcwd(), mod_root))
 
     if IsPathSuffix(mod_root, root):
-      return module
+      module = sys.modules.get(name)
+      if getattr(module, '__file__', None) == mod_file:
+        return module
 
   return None
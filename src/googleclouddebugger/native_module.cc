@@ -164,6 +164,18 @@ static PyObject* LogInfo(PyObject* self, PyObject* py_args) {
   return LogCommon(LOG_SEVERITY_INFO, py_args);
 }
 
+// Checks whether messages logged with LogInfo are emitted. Python code uses
+// it to skip formatting messages that would be discarded anyway.
+//
+// Returns: True if INFO level logging is enabled, False otherwise.
+static PyObject* IsInfoLogEnabled(PyObject* self, PyObject* py_args) {
+  if (FLAGS_minloglevel <= LOG_SEVERITY_INFO) {
+    Py_RETURN_TRUE;
+  } else {
+    Py_RETURN_FALSE;
+  }
+}
+
 // Logs a message at WARNING level from Python code.
 static PyObject* LogWarning(PyObject* self, PyObject* py_args) {
   return LogCommon(LOG_SEVERITY_WARNING, py_args);
@@ -362,6 +374,23 @@ static PyObject* ApplyDynamicLogsQuota(PyObject* self, PyObject* py_args) {
   }
 }
 
+// Checks whether the dynamic logs quota fully recovered since it was last
+// used. Only meant for tests that need a known starting state.
+//
+// Returns:
+//   True if both the message and the bytes quota fully recovered.
+static PyObject* IsDynamicLogsQuotaRecovered(PyObject* self,
+                                             PyObject* py_args) {
+  LazyInitializeRateLimit();
+
+  if (GetGlobalDynamicLogQuota()->IsFullyRecovered() &&
+      GetGlobalDynamicLogBytesQuota()->IsFullyRecovered()) {
+    Py_RETURN_TRUE;
+  } else {
+    Py_RETURN_FALSE;
+  }
+}
+
 static PyMethodDef g_module_functions[] = {
   {
      "InitializeModule",
@@ -375,6 +404,12 @@ static PyMethodDef g_module_functions[] = {
     METH_VARARGS,
     "INFO level logging from Python code."
   },
+  {
+    "IsInfoLogEnabled",
+    IsInfoLogEnabled,
+    METH_NOARGS,
+    "Checks whether INFO level logging is enabled."
+  },
   {
     "LogWarning",
     LogWarning,
@@ -417,6 +452,12 @@ static PyMethodDef g_module_functions[] = {
     METH_VARARGS,
     "Applies the dynamic log quota"
   },
+  {
+    "IsDynamicLogsQuotaRecovered",
+    IsDynamicLogsQuotaRecovered,
+    METH_NOARGS,
+    "Checks whether the dynamic log quota fully recovered"
+  },
   { nullptr, nullptr, 0, nullptr }  // sentinel
 };
 
@@ -475,11 +516,20 @@ void InitDebuggerNativeModule() {
 
 
 // This function is called to initialize the module.
+//
+// The module is compiled with -fvisibility=hidden. PyMODINIT_FUNC only exports
+// the function starting with Python 3.9, so it is declared with default
+// visibility explicitly. Otherwise the module fails to import on older versions.
 #if PY_MAJOR_VERSION >= 3
+extern "C" __attribute__((visibility("default")))
+PyObject* PyInit_cdbg_native();
+
 PyMODINIT_FUNC PyInit_cdbg_native() {
   return devtools::cdbg::InitDebuggerNativeModuleInternal();
 }
 #else
+extern "C" __attribute__((visibility("default"))) void initcdbg_native();
+
 PyMODINIT_FUNC initcdbg_native() {
   devtools::cdbg::InitDebuggerNativeModule();
 }
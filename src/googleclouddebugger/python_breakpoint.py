@@ -15,9 +15,15 @@
 
 from datetime import datetime
 from datetime import timedelta
+import functools
 import os
+import re
+import sys
 from threading import Lock
 
+# These modules are deliberately imported eagerly. Breakpoints get activated
+# from import hook callbacks and from the native breakpoint callback, where
+# importing a module for the first time can deadlock on the import lock.
 from . import collector
 from . import cdbg_native as native
 from . import imphook
@@ -56,14 +62,41 @@ ERROR_AGE_SNAPSHOT_EXPIRED_0 = ('The snapshot has expired')
 ERROR_AGE_LOGPOINT_EXPIRED_0 = ('The logpoint has expired')
 ERROR_UNSPECIFIED_INTERNAL_ERROR = ('Internal error occurred')
 
-# Status messages for different breakpoint events (except of "hit").
-_BREAKPOINT_EVENT_STATUS = dict([
-    (native.BREAKPOINT_EVENT_ERROR, {
-        'isError': True,
-        'description': {
-            'format': ERROR_UNSPECIFIED_INTERNAL_ERROR
-        }
-    }),
+# Errors for a location without code, indexed by number of alternative lines.
+_ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_FORMATS = (
+    ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_2,
+    ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_3,
+    ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_4)
+
+
+def _BuildEventStatusTable(statuses, default):
+  """Converts a list of (event, status) pairs into a tuple indexed by event.
+
+  Breakpoint events are small consecutive integers, so indexing a tuple is
+  cheaper than a dictionary lookup. Events without a status map to default.
+  """
+  table = [default] * (max(event for event, _ in statuses) + 1)
+  for event, status in statuses:
+    table[event] = status
+  return tuple(table)
+
+
+# Breakpoint hit event, bound once to avoid the cdbg_native attribute lookup in
+# the breakpoint callbacks.
+_BREAKPOINT_EVENT_HIT = native.BREAKPOINT_EVENT_HIT
+
+# Status of BREAKPOINT_EVENT_ERROR and of any event this module doesn't know.
+_BREAKPOINT_EVENT_ERROR_STATUS = {
+    'isError': True,
+    'description': {
+        'format': ERROR_UNSPECIFIED_INTERNAL_ERROR
+    }
+}
+
+# Status messages for different breakpoint events (except of "hit"), indexed
+# by the event. The status dictionaries are shared by all breakpoints and are
+# sent to the hub client by reference, so they must never be modified.
+_BREAKPOINT_EVENT_STATUS = _BuildEventStatusTable([
     (native.BREAKPOINT_EVENT_GLOBAL_CONDITION_QUOTA_EXCEEDED, {
         'isError': True,
         'refersTo': 'BREAKPOINT_CONDITION',
@@ -85,14 +118,63 @@ _BREAKPOINT_EVENT_STATUS = dict([
             'format': ERROR_CONDITION_MUTABLE_0
         }
     })
-])
+], _BREAKPOINT_EVENT_ERROR_STATUS)
+
+# Completion statuses that don't take any parameters. Like the statuses above,
+# they are shared and must never be modified.
+_LOCATION_FILE_EXTENSION_STATUS = {
+    'isError': True,
+    'refersTo': 'BREAKPOINT_SOURCE_LOCATION',
+    'description': {
+        'format': ERROR_LOCATION_FILE_EXTENSION_0
+    }
+}
+_SNAPSHOT_EXPIRED_STATUS = {
+    'isError': True,
+    'refersTo': 'BREAKPOINT_AGE',
+    'description': {
+        'format': ERROR_AGE_SNAPSHOT_EXPIRED_0
+    }
+}
+_LOGPOINT_EXPIRED_STATUS = {
+    'isError': True,
+    'refersTo': 'BREAKPOINT_AGE',
+    'description': {
+        'format': ERROR_AGE_LOGPOINT_EXPIRED_0
+    }
+}
+
+# UTC timestamp in RFC3339 format: YYYY-MM-DDTHH:MM:SS[.ffffff]Z.
+_RFC3339_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?Z\Z')
+
+# Maximum number of paths for which normalization and module search results
+# are cached.
+_MAX_SEARCH_CACHE_SIZE = 512
+
+# Copy of sys.path at the time _CachedSearch results were computed.
+_search_sys_path = None
+
+
+def _GetEventStatus(event):
+  """Returns the completion status for a breakpoint event other than "hit".
+
+  Events unknown to this module (e.g. added to cdbg_native later) are reported
+  as an internal error.
+  """
+  if 0 <= event < len(_BREAKPOINT_EVENT_STATUS):
+    return _BREAKPOINT_EVENT_STATUS[event]
+  return _BREAKPOINT_EVENT_ERROR_STATUS
 
-# The implementation of datetime.strptime imports an undocumented module called
-# _strptime. If it happens at the wrong time, we can get an exception about
-# trying to import while another thread holds the import lock. This dummy call
-# to strptime ensures that the module is loaded at startup.
-# See http://bugs.python.org/issue7980 for discussion of the Python bug.
-datetime.strptime('2017-01-01', '%Y-%m-%d')
+
+def _HasPyExtension(path):
+  """Checks whether os.path.splitext(path) would return a .py extension.
+
+  Equivalent to the os.path.splitext check, but without the Python level scan
+  of the path. Dotfiles such as '.py' or 'a/..py' don't have an extension.
+  """
+  return (path.endswith('.py') and
+          bool(path[:-3].rpartition(os.sep)[2].lstrip('.')))
 
 
 def _IsRootInitPy(path):
@@ -101,12 +183,19 @@ def _IsRootInitPy(path):
 
 def _StripCommonPathPrefix(paths):
   """Removes path common prefix from a list of path strings."""
-  # Find the longest common prefix in terms of characters.
-  common_prefix = os.path.commonprefix(paths)
-  # Truncate at last segment boundary. E.g. '/aa/bb1/x.py' and '/a/bb2/x.py'
+  # The common prefix of all paths is the common prefix of the
+  # lexicographically smallest and largest ones. Find its length in terms of
+  # characters without building the prefix string.
+  first = min(paths)
+  last = max(paths)
+  common_len = 0
+  max_len = min(len(first), len(last))
+  while common_len < max_len and first[common_len] == last[common_len]:
+    common_len += 1
+  # Truncate at last segment boundary. E.g. '/aa/bb1/x.py' and '/aa/bb2/x.py'
   # have '/aa/bb' as the common prefix, but we should strip '/aa/' instead.
-  # If there's no '/' found, returns -1+1=0.
-  common_prefix_len = common_prefix.rfind('/') + 1
+  # If there's no separator found, returns -1+1=0.
+  common_prefix_len = first.rfind(os.sep, 0, common_len) + 1
   return [path[common_prefix_len:] for path in paths]
 
 
@@ -132,11 +221,79 @@ def _MultipleModulesFoundError(path, candidates):
   return fmt, params
 
 
+@functools.lru_cache(maxsize=_MAX_SEARCH_CACHE_SIZE)
 def _NormalizePath(path):
   """Removes surrounding whitespace, leading separator and normalize."""
   return module_utils.NormalizePath(path.strip().lstrip(os.sep))
 
 
+@functools.lru_cache(maxsize=_MAX_SEARCH_CACHE_SIZE)
+def _CachedSearch(path):
+  """Returns the file module_search.Search found for path.
+
+  Raises:
+    LookupError: if no file was found. lru_cache doesn't keep exceptions, so a
+        file that shows up later is found by the next search.
+  """
+  result = module_search.Search(path)
+  if result == path:
+    raise LookupError(path)
+  return result
+
+
+def _SearchModule(path):
+  """Memoized version of module_search.Search.
+
+  Only paths that were resolved to a file are cached. The cache is dropped
+  whenever sys.path changes and whenever a module a breakpoint was waiting for
+  gets imported (see _ActivateBreakpointOnImport). A cached match whose file
+  no longer exists is searched again.
+
+  Args:
+    path: normalized breakpoint path with .py extension.
+
+  Returns:
+    Same as module_search.Search.
+  """
+  global _search_sys_path
+
+  # Comparing against the copy doesn't allocate, unlike building a key.
+  if sys.path != _search_sys_path:
+    _CachedSearch.cache_clear()
+    _search_sys_path = list(sys.path)
+
+  try:
+    result = _CachedSearch(path)
+    if not os.path.isfile(result):
+      _CachedSearch.cache_clear()
+      result = _CachedSearch(path)
+  except LookupError:
+    return path
+  return result
+
+
+@functools.lru_cache(maxsize=256)
+def _CompileCondition(condition):
+  """Compiles a breakpoint condition expression.
+
+  Code objects are immutable, so breakpoints with the same condition share the
+  compiled code. Compilation errors are cached as well, so an invalid condition
+  is not compiled again.
+
+  Args:
+    condition: condition expression string.
+
+  Returns:
+    (code, error) tuple. code is the compiled code object or None if the
+    compilation failed, in which case error is the raised exception.
+  """
+  try:
+    return compile(condition, '<condition_expression>', 'eval'), None
+  except (TypeError, ValueError, SyntaxError) as e:
+    # Don't keep the compilation frames alive in the cache.
+    return None, e.with_traceback(None)
+
+
 class PythonBreakpoint(object):
   """Handles a single Python breakpoint.
 
@@ -146,6 +303,13 @@ class PythonBreakpoint(object):
   to log a statement.
   """
 
+  # There is one instance per active breakpoint and its attributes are read on
+  # every breakpoint hit.
+  __slots__ = ('definition', 'data_visibility_policy', 'expiration_period',
+               '_id', '_is_logpoint', '_expiration_time', '_hub_client',
+               '_breakpoints_manager', '_cookie', '_import_hook_cleanup',
+               '_lock', '_completed', '_collector', '_line')
+
   def __init__(self, definition, hub_client, breakpoints_manager,
                data_visibility_policy):
     """Class constructor.
@@ -162,40 +326,45 @@ class PythonBreakpoint(object):
           of a captured variable.  May be None if no policy is available.
     """
     self.definition = definition
+    self._id = definition['id']
+
+    # Whether this is a logpoint rather than a snapshot.
+    self._is_logpoint = self.definition.get('action') == 'LOG'
 
     self.data_visibility_policy = data_visibility_policy
 
     # Breakpoint expiration time.
     self.expiration_period = timedelta(hours=24)
-    if self.definition.get('expires_in'):
+    expires_in = self.definition.get('expires_in')
+    if expires_in:
       self.expiration_period = min(
-          timedelta(definition.get('expires_in').get('seconds', 0)),
+          timedelta(seconds=expires_in.get('seconds', 0)),
           self.expiration_period)
 
+    # The creation time never changes, so the expiration time is only computed
+    # once rather than on every expiration check.
+    self._expiration_time = self._ComputeExpirationTime()
+
     self._hub_client = hub_client
     self._breakpoints_manager = breakpoints_manager
     self._cookie = None
     self._import_hook_cleanup = None
 
+    # One-shot latch guarding completion. See _SetCompleted.
     self._lock = Lock()
     self._completed = False
 
-    if self.definition.get('action') == 'LOG':
-      self._collector = collector.LogCollector(self.definition)
+    # Log collector of a logpoint, created on the first hit.
+    self._collector = None
+
+    location = self.definition['location']
+    self._line = location['line']
 
-    path = _NormalizePath(self.definition['location']['path'])
+    path = _NormalizePath(location['path'])
 
     # Only accept .py extension.
-    if os.path.splitext(path)[1] != '.py':
-      self._CompleteBreakpoint({
-          'status': {
-              'isError': True,
-              'refersTo': 'BREAKPOINT_SOURCE_LOCATION',
-              'description': {
-                  'format': ERROR_LOCATION_FILE_EXTENSION_0
-              }
-          }
-      })
+    if not _HasPyExtension(path):
+      self._CompleteBreakpoint({'status': _LOCATION_FILE_EXTENSION_STATUS})
       return
 
     # A flat init file is too generic; path must include package name.
@@ -212,14 +381,14 @@ class PythonBreakpoint(object):
       })
       return
 
-    new_path = module_search.Search(path)
+    new_path = _SearchModule(path)
     new_module = module_utils.GetLoadedModuleBySuffix(new_path)
 
     if new_module:
       self._ActivateBreakpoint(new_module)
     else:
       self._import_hook_cleanup = imphook.AddImportCallbackBySuffix(
-          new_path, self._ActivateBreakpoint)
+          new_path, self._ActivateBreakpointOnImport)
 
   def Clear(self):
     """Clears the breakpoint and releases all breakpoint resources.
@@ -229,22 +398,39 @@ class PythonBreakpoint(object):
     """
     self._RemoveImportHook()
     if self._cookie is not None:
-      native.LogInfo('Clearing breakpoint %s' % self.GetBreakpointId())
+      if native.IsInfoLogEnabled():
+        native.LogInfo('Clearing breakpoint %s' % self.GetBreakpointId())
       native.ClearConditionalBreakpoint(self._cookie)
       self._cookie = None
 
     self._completed = True  # Never again send updates for this breakpoint.
 
   def GetBreakpointId(self):
-    return self.definition['id']
+    return self._id
 
   def GetExpirationTime(self):
-    """Computes the timestamp at which this breakpoint will expire.
+    """Returns the timestamp at which this breakpoint will expire.
 
     If no creation time can be found an expiration time in the past will be
     used.
     """
-    return self.GetCreateTime() + self.expiration_period
+    return self._expiration_time
+
+  def _ComputeExpirationTime(self):
+    """Computes the timestamp at which this breakpoint will expire.
+
+    Called from the constructor, so a malformed creation time must not raise.
+    Such a breakpoint gets an expiration time in the past instead.
+    """
+    try:
+      create_time = self.GetCreateTime()
+    except (TypeError, ValueError) as e:
+      native.LogWarning(
+          'Unexpected error (%s) occured processing createTime %r, '
+          'breakpoint: %s' % (repr(e), self.definition.get('createTime'),
+                              self.GetBreakpointId()))
+      create_time = datetime.fromtimestamp(0)
+    return create_time + self.expiration_period
 
   def GetCreateTime(self):
     """Retrieves the creation time of this breakpoint.
@@ -258,12 +444,22 @@ class PythonBreakpoint(object):
           self.definition.get('createTimeUnixMsec', 0))
 
   def GetTimeFromRfc3339Str(self, rfc3339_str):
-    if '.' not in rfc3339_str:
-      fmt = '%Y-%m-%dT%H:%M:%S%Z'
-    else:
-      fmt = '%Y-%m-%dT%H:%M:%S.%f%Z'
+    """Parses a UTC timestamp formatted as YYYY-MM-DDTHH:MM:SS[.ffffff]Z.
+
+    The fixed layout is parsed directly instead of going through
+    datetime.strptime, which is much slower.
+
+    Raises:
+      ValueError: if rfc3339_str is not a valid timestamp.
+    """
+    match = _RFC3339_PATTERN.match(rfc3339_str)
+    if not match:
+      raise ValueError('Invalid RFC3339 timestamp: %s' % rfc3339_str)
 
-    return datetime.strptime(rfc3339_str.replace('Z', 'UTC'), fmt)
+    year, month, day, hour, minute, second, fraction = match.groups()
+    return datetime(
+        int(year), int(month), int(day), int(hour), int(minute), int(second),
+        int(fraction.ljust(6, '0')) if fraction else 0)
 
   def GetTimeFromUnixMsec(self, unix_msec):
     try:
@@ -280,19 +476,18 @@ class PythonBreakpoint(object):
     if not self._SetCompleted():
       return
 
-    if self.definition.get('action') == 'LOG':
-      message = ERROR_AGE_LOGPOINT_EXPIRED_0
+    if self._is_logpoint:
+      status = _LOGPOINT_EXPIRED_STATUS
     else:
-      message = ERROR_AGE_SNAPSHOT_EXPIRED_0
-    self._CompleteBreakpoint({
-        'status': {
-            'isError': True,
-            'refersTo': 'BREAKPOINT_AGE',
-            'description': {
-                'format': message
-            }
-        }
-    })
+      status = _SNAPSHOT_EXPIRED_STATUS
+    self._CompleteBreakpoint({'status': status})
+
+  def _ActivateBreakpointOnImport(self, module):
+    """Import hook callback. Activates the breakpoint in the loaded module."""
+    # Imports may come with new files or sys.path entries, which makes earlier
+    # module search results unreliable.
+    _CachedSearch.cache_clear()
+    self._ActivateBreakpoint(module)
 
   def _ActivateBreakpoint(self, module):
     """Sets the breakpoint in the loaded module, or complete with error."""
@@ -300,7 +495,12 @@ class PythonBreakpoint(object):
     # First remove the import hook (if installed).
     self._RemoveImportHook()
 
-    line = self.definition['location']['line']
+    # The import hook iterates over a copy of its callbacks, so it may still
+    # invoke this callback after the breakpoint has been completed or cleared.
+    if self._completed:
+      return
+
+    line = self._line
 
     # Find the code object in which the breakpoint is being set.
     status, codeobj = module_explorer.GetCodeObjectAtLine(module, line)
@@ -313,15 +513,9 @@ class PythonBreakpoint(object):
 
       # The next 0, 1, or 2 parameters are the alternative lines to set the
       # breakpoint at, displayed for the user's convenience.
-      alt_lines = (str(l) for l in codeobj if l is not None)
+      alt_lines = [str(l) for l in codeobj if l is not None]
       params += alt_lines
-
-      if len(params) == 4:
-        fmt = ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_4
-      elif len(params) == 3:
-        fmt = ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_3
-      else:
-        fmt = ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_2
+      fmt = _ERROR_LOCATION_NO_CODE_FOUND_AT_LINE_FORMATS[len(alt_lines)]
 
       self._CompleteBreakpoint({
           'status': {
@@ -338,41 +532,45 @@ class PythonBreakpoint(object):
     # Compile the breakpoint condition.
     condition = None
     if self.definition.get('condition'):
-      try:
-        condition = compile(
-            self.definition.get('condition'), '<condition_expression>', 'eval')
-      except (TypeError, ValueError) as e:
-        # condition string contains null bytes.
+      condition, error = _CompileCondition(self.definition.get('condition'))
+      if isinstance(error, SyntaxError):
         self._CompleteBreakpoint({
             'status': {
                 'isError': True,
                 'refersTo': 'BREAKPOINT_CONDITION',
                 'description': {
-                    'format': 'Invalid expression',
-                    'parameters': [str(e)]
+                    'format': 'Expression could not be compiled: $0',
+                    'parameters': [error.msg]
                 }
             }
         })
         return
 
-      except SyntaxError as e:
+      if error is not None:
+        # condition string contains null bytes.
         self._CompleteBreakpoint({
             'status': {
                 'isError': True,
                 'refersTo': 'BREAKPOINT_CONDITION',
                 'description': {
-                    'format': 'Expression could not be compiled: $0',
-                    'parameters': [e.msg]
+                    'format': 'Invalid expression',
+                    'parameters': [str(error)]
                 }
             }
         })
         return
 
-    native.LogInfo('Creating new Python breakpoint %s in %s, line %d' %
-                   (self.GetBreakpointId(), codeobj, line))
+    if native.IsInfoLogEnabled():
+      native.LogInfo('Creating new Python breakpoint %s in %s, line %d' %
+                     (self.GetBreakpointId(), codeobj, line))
+
+    if self._is_logpoint:
+      callback = self._LogpointEvent
+    else:
+      callback = self._BreakpointEvent
 
     self._cookie = native.CreateConditionalBreakpoint(codeobj, line, condition,
-                                                      self._BreakpointEvent)
+                                                      callback)
 
     native.ActivateConditionalBreakpoint(self._cookie)
 
@@ -385,13 +583,42 @@ class PythonBreakpoint(object):
   def _CompleteBreakpoint(self, data, is_incremental=True):
     """Sends breakpoint update and deactivates the breakpoint."""
     if is_incremental:
-      data = dict(self.definition, **data)
+      update = data
+      data = self.definition.copy()
+      data.update(update)
     data['isFinalState'] = True
 
     self._hub_client.EnqueueBreakpointUpdate(data)
     self._breakpoints_manager.CompleteBreakpoint(self.GetBreakpointId())
     self.Clear()
 
+  def _LogpointEvent(self, event, frame):
+    """Callback invoked by cdbg_native when logpoint hits.
+
+    Unlike snapshots, logpoints keep firing after a successful hit. This
+    callback is installed for logpoints instead of _BreakpointEvent to keep
+    that path short.
+
+    Args:
+      event: breakpoint event (see kIntegerConstants in native_module.cc).
+      frame: Python stack frame of breakpoint hit or None for other events.
+    """
+    if event == _BREAKPOINT_EVENT_HIT:
+      if self._collector is None:
+        self._collector = collector.LogCollector(self.definition)
+      error_status = self._collector.Log(frame)
+      if not error_status:
+        return  # Log action successful, no need to clear the breakpoint.
+    else:
+      error_status = _GetEventStatus(event)
+
+    # Let only one thread complete the breakpoint.
+    if not self._SetCompleted():
+      return
+
+    self.Clear()
+    self._CompleteBreakpoint({'status': error_status})
+
   def _SetCompleted(self):
     """Atomically marks the breakpoint as completed.
 
@@ -399,11 +626,21 @@ class PythonBreakpoint(object):
       True if the breakpoint wasn't marked already completed or False if the
       breakpoint was already completed.
     """
-    with self._lock:
-      if self._completed:
-        return False
-      self._completed = True
-      return True
+    # Once set, the flag is never cleared. Skip the lock on the common path of
+    # a breakpoint that keeps firing after it has been completed.
+    if self._completed:
+      return False
+
+    # The lock is acquired without blocking and never released, so only the
+    # first caller gets through. Other threads bail out right away instead of
+    # waiting for the winner to finish.
+    if not self._lock.acquire(blocking=False):
+      return False
+
+    # Clear() may have marked the breakpoint completed in the meantime.
+    completed = self._completed
+    self._completed = True
+    return not completed
 
   def _BreakpointEvent(self, event, frame):
     """Callback invoked by cdbg_native when breakpoint hits.
@@ -412,14 +649,9 @@ class PythonBreakpoint(object):
       event: breakpoint event (see kIntegerConstants in native_module.cc).
       frame: Python stack frame of breakpoint hit or None for other events.
     """
-    error_status = None
-
-    if event != native.BREAKPOINT_EVENT_HIT:
-      error_status = _BREAKPOINT_EVENT_STATUS[event]
-    elif self.definition.get('action') == 'LOG':
-      error_status = self._collector.Log(frame)
-      if not error_status:
-        return  # Log action successful, no need to clear the breakpoint.
+    if self._is_logpoint:
+      self._LogpointEvent(event, frame)
+      return
 
     # Let only one thread capture the data and complete the breakpoint.
     if not self._SetCompleted():
@@ -427,8 +659,8 @@ class PythonBreakpoint(object):
 
     self.Clear()
 
-    if error_status:
-      self._CompleteBreakpoint({'status': error_status})
+    if event != _BREAKPOINT_EVENT_HIT:
+      self._CompleteBreakpoint({'status': _GetEventStatus(event)})
       return
 
     capture_collector = collector.CaptureCollector(self.definition,
@@ -32,6 +32,23 @@ import sys
 _MAX_DEPTH = 10
 
 
+def _GetModuleName(file_name):
+  """Returns file_name without its .py, .pyc or .pyo extension or None.
+
+  Equivalent to checking the extension returned by os.path.splitext, which is
+  much slower for this simple case.
+  """
+  if file_name.endswith('.py'):
+    module_name = file_name[:-3]
+  elif file_name.endswith(('.pyc', '.pyo')):
+    module_name = file_name[:-4]
+  else:
+    return None
+
+  # Leading dots don't start an extension (e.g. '.py' is not a module).
+  return module_name if module_name.lstrip('.') else None
+
+
 def ComputeApplicationUniquifier(hash_obj):
   """Computes hash of application files.
 
@@ -59,56 +76,74 @@ def ComputeApplicationUniquifier(hash_obj):
     hash_obj: hash aggregator to update with application uniquifier.
   """
 
-  def ProcessDirectory(path, relative_path, depth=1):
-    """Recursively computes application uniquifier for a particular directory.
+  # Directories are traversed depth first. Each stack element holds an iterator
+  # over the sorted entries of a directory that is still being processed, so
+  # that no Python recursion is needed.
+  stack = []
+
+  def PushDirectory(path, relative_path, depth):
+    """Schedules a directory for computing the application uniquifier.
 
     Args:
-      path: absolute path of the directory to start.
+      path: absolute path of the directory.
       relative_path: path relative to sys.path[0]
-      depth: current recursion depth.
+      depth: current traversal depth.
     """
 
     if depth > _MAX_DEPTH:
       return
 
+    # os.scandir returns the file type along with the name, which saves a stat
+    # call for most of the entries.
     try:
-      names = os.listdir(path)
-    except BaseException:
+      with os.scandir(path) as it:
+        entries = list(it)
+    except OSError:
       return
 
     # Sort file names to ensure consistent hash regardless of order returned
-    # by os.listdir. This will also put .py files before .pyc and .pyo files.
-    modules = set()
-    for name in sorted(names):
-      current_path = os.path.join(path, name)
-      if not os.path.isdir(current_path):
-        file_name, ext = os.path.splitext(name)
-        if ext not in ('.py', '.pyc', '.pyo'):
-          continue  # This is not an application file.
-        if file_name in modules:
-          continue  # This is a .pyc file and we already indexed .py file.
+    # by os.scandir. This will also put .py files before .pyc and .pyo files.
+    entries.sort(key=lambda entry: entry.name)
 
-        modules.add(file_name)
-        ProcessApplicationFile(current_path, os.path.join(relative_path, name))
-      elif IsPackage(current_path):
-        ProcessDirectory(current_path, os.path.join(relative_path, name),
-                         depth + 1)
+    # Entry names never contain a separator, so relative paths of the entries
+    # are built by concatenation rather than with os.path.join.
+    relative_prefix = relative_path + os.sep if relative_path else ''
+    stack.append((iter(entries), relative_prefix, depth, set()))
 
   def IsPackage(path):
     """Checks if the specified directory is a valid Python package."""
+    # Python 3 never imports .pyo files (PEP 488), so a directory with just an
+    # __init__.pyo file is not a package.
     init_base_path = os.path.join(path, '__init__.py')
     return (os.path.isfile(init_base_path) or
-            os.path.isfile(init_base_path + 'c') or
-            os.path.isfile(init_base_path + 'o'))
+            os.path.isfile(init_base_path + 'c'))
 
-  def ProcessApplicationFile(path, relative_path):
+  def ProcessApplicationFile(entry, relative_path):
     """Updates the hash with the specified application file."""
-    hash_obj.update(relative_path.encode())
-    hash_obj.update(':'.encode())
     try:
-      hash_obj.update(str(os.stat(path).st_size).encode())
-    except BaseException:
-      pass
-    hash_obj.update('\n'.encode())
+      # DirEntry caches the stat result, e.g. from a previous is_dir call.
+      size = str(entry.stat().st_size)
+    except OSError:
+      size = ''
+    hash_obj.update(('%s:%s\n' % (relative_path, size)).encode())
+
+  PushDirectory(sys.path[0], '', 1)
+  while stack:
+    entries, relative_prefix, depth, modules = stack[-1]
+    for entry in entries:
+      name = entry.name
+      if not entry.is_dir():
+        file_name = _GetModuleName(name)
+        if file_name is None:
+          continue  # This is not an application file.
+        if file_name in modules:
+          continue  # This is a .pyc file and we already indexed .py file.
 
-  ProcessDirectory(sys.path[0], '')
+        modules.add(file_name)
+        ProcessApplicationFile(entry, relative_prefix + name)
+      elif IsPackage(entry.path):
+        # Process the package before the remaining entries of this directory.
+        PushDirectory(entry.path, relative_prefix + name, depth + 1)
+        break
+    else:
+      stack.pop()
@@ -28,6 +28,16 @@ import os
 import sys
 import yaml
 
+try:
+  # The libyaml based loader is much faster, but PyYAML might have been built
+  # without it.
+  from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+  from yaml import SafeLoader as _SafeLoader
+
+# Keys allowed at the top level of the configuration.
+_LEGAL_KEYS = frozenset(('blacklist', 'whitelist'))
+
 
 class Error(Exception):
   """Generic error class that other errors in this module inherit from."""
@@ -62,6 +72,8 @@ class ElementNotAStringError(Error):
 class Config(object):
   """Configuration object that Read() returns to the caller."""
 
+  __slots__ = ('blacklist_patterns', 'whitelist_patterns')
+
   def __init__(self, blacklist_patterns, whitelist_patterns):
     self.blacklist_patterns = blacklist_patterns
     self.whitelist_patterns = whitelist_patterns
@@ -83,7 +95,7 @@ def OpenAndRead(relative_path='debugger-blacklist.yaml'):
 
   # Note: This logic follows the convention established by source-context.json
   try:
-    with open(os.path.join(sys.path[0], relative_path), 'r') as f:
+    with open(os.path.join(sys.path[0], relative_path), 'rb') as f:
       return Read(f)
   except IOError:
     return None
@@ -102,7 +114,7 @@ def Read(f):
     Error (some subclass): If there is a problem loading or parsing the file.
   """
   try:
-    yaml_data = yaml.safe_load(f)
+    yaml_data = yaml.load(f, Loader=_SafeLoader)
   except yaml.YAMLError as e:
     raise ParseError('%s' % e)
   except IOError as e:
@@ -119,8 +131,7 @@ def Read(f):
 
 def _CheckData(yaml_data):
   """Checks data for illegal keys and formatting."""
-  legal_keys = set(('blacklist', 'whitelist'))
-  unknown_keys = set(yaml_data) - legal_keys
+  unknown_keys = set(yaml_data) - _LEGAL_KEYS
   if unknown_keys:
     raise UnknownConfigKeyError('Unknown keys in configuration: %s' %
                                 unknown_keys)
@@ -134,7 +145,7 @@ def _AssertDataIsList(key, lst):
 
   # list and tuple are supported.  Not supported are direct strings
   # and dictionary; these indicate too much or two little structure.
-  if not isinstance(lst, list) and not isinstance(lst, tuple):
+  if not isinstance(lst, (list, tuple)):
     raise NotAListError('%s must be a list' % key)
 
   # each list entry must be a string
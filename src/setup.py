@@ -13,22 +13,24 @@
 # limitations under the License.
 """Python Cloud Debugger build and packaging script."""
 
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
+from configparser import Error as ConfigParserError
 from glob import glob
 import os
 import re
+import shutil
+import sys
 from distutils import sysconfig
+from distutils.errors import DistutilsOptionError
 from setuptools import Extension
 from setuptools import setup
+from setuptools.command.build_ext import build_ext
 
 
 def RemovePrefixes(optlist, bad_prefixes):
-  for bad_prefix in bad_prefixes:
-    for i, flag in enumerate(optlist):
-      if flag.startswith(bad_prefix):
-        optlist.pop(i)
-        break
-  return optlist
+  bad_prefixes = tuple(bad_prefixes)
+  return [flag for flag in optlist if not flag.startswith(bad_prefixes)]
 
 
 def ReadConfig(section, value, default):
@@ -36,10 +38,112 @@ def ReadConfig(section, value, default):
     config = ConfigParser()
     config.read('setup.cfg')
     return config.get(section, value)
-  except:  # pylint: disable=bare-except
+  except ConfigParserError:
     return default
 
 
+def NeedsLibRt():
+  """Checks whether clock_gettime needs to be linked from librt.
+
+  glibc moved clock_gettime from librt to libc in version 2.17. Other C
+  libraries (e.g. musl) always had it in libc.
+  """
+  try:
+    libc_version = os.confstr('CS_GNU_LIBC_VERSION')
+  except (AttributeError, ValueError, OSError):
+    return False  # Not glibc.
+  if not libc_version or not libc_version.startswith('glibc '):
+    return False
+  version = libc_version[len('glibc '):].split('.')
+  return tuple(int(part) for part in version[:2]) < (2, 17)
+
+
+def FindStaticLibs(lib_dirs, deps):
+  """Returns the paths of the deps libraries, looked up in lib_dirs order."""
+  found = {}
+  wanted = set(deps)
+  for lib_dir in lib_dirs:
+    try:
+      with os.scandir(lib_dir or '.') as it:
+        for entry in it:
+          if entry.name in wanted and entry.is_file():
+            found.setdefault(entry.name, entry.path)
+    except OSError:
+      continue
+  return [found[dep] for dep in deps if dep in found]
+
+
+def ParallelCompile(compiler, jobs):
+  """Makes compiler compile the sources of an extension in parallel.
+
+  build_ext only builds separate extensions in parallel, while all of our
+  sources belong to the single cdbg_native extension.
+  """
+
+  def Compile(sources, output_dir=None, macros=None, include_dirs=None,
+              debug=0, extra_preargs=None, extra_postargs=None, depends=None):
+    # Same as CCompiler.compile, except for running _compile in parallel.
+    # pylint: disable=protected-access
+    macros, objects, extra_postargs, pp_opts, build = compiler._setup_compile(
+        output_dir, macros, include_dirs, sources, depends, extra_postargs)
+    cc_args = compiler._get_cc_args(pp_opts, debug, extra_preargs)
+
+    def CompileObject(obj):
+      if obj in build:
+        src, ext = build[obj]
+        compiler._compile(obj, src, ext, cc_args, extra_postargs, pp_opts)
+
+    with ThreadPoolExecutor(jobs) as executor:
+      list(executor.map(CompileObject, objects))
+    return objects
+
+  compiler.compile = Compile
+
+
+# Directory with the profile data of profile guided optimization builds.
+PGO_DATA_DIR = os.path.abspath('pgo-data')
+
+
+class BuildExt(build_ext):
+  """Builds the native module with one compiler job per CPU by default.
+
+  Also supports a profile guided optimization build in two steps. First build
+  with --pgo=generate and exercise the instrumented module (e.g. by running the
+  tests). Then rebuild with --pgo=use to optimize based on the collected
+  profile in PGO_DATA_DIR.
+  """
+
+  user_options = build_ext.user_options + [
+      ('pgo=', None, 'profile guided optimization step: "generate" or "use"'),
+  ]
+
+  def initialize_options(self):
+    build_ext.initialize_options(self)
+    self.pgo = None
+
+  def finalize_options(self):
+    build_ext.finalize_options(self)
+    if self.pgo not in (None, 'generate', 'use'):
+      raise DistutilsOptionError('--pgo must be "generate" or "use"')
+
+  def build_extensions(self):
+    if self.pgo == 'generate':
+      compile_args = ['-fprofile-generate=' + PGO_DATA_DIR]
+      link_args = compile_args
+    elif self.pgo == 'use':
+      compile_args = ['-fprofile-use=' + PGO_DATA_DIR, '-fprofile-correction']
+      link_args = []
+    else:
+      compile_args = link_args = []
+
+    for ext in self.extensions:
+      ext.extra_compile_args = ext.extra_compile_args + compile_args
+      ext.extra_link_args = ext.extra_link_args + link_args
+
+    ParallelCompile(self.compiler, self.parallel or os.cpu_count() or 1)
+    build_ext.build_extensions(self)
+
+
 LONG_DESCRIPTION = (
     'The Cloud Debugger lets you inspect the state of an application at any\n'
     'code location without stopping or slowing it down. The debugger makes it\n'
@@ -53,13 +157,8 @@ lib_dirs = ReadConfig('build_ext', 'library_dirs',
 extra_compile_args = ReadConfig('cc_options', 'extra_compile_args', '').split()
 extra_link_args = ReadConfig('cc_options', 'extra_link_args', '').split()
 
-static_libs = []
 deps = ['libgflags.a', 'libglog.a']
-for dep in deps:
-  for lib_dir in lib_dirs:
-    path = os.path.join(lib_dir, dep)
-    if os.path.isfile(path):
-      static_libs.append(path)
+static_libs = FindStaticLibs(lib_dirs, deps)
 assert len(static_libs) == len(deps), (static_libs, deps, lib_dirs)
 
 cvars = sysconfig.get_config_vars()
@@ -68,30 +167,50 @@ cvars['OPT'] = str.join(
     RemovePrefixes(
         cvars.get('OPT').split(), ['-g', '-O', '-Wstrict-prototypes']))
 
+# Use ccache for rebuilds when it is available, unless the compiler was chosen
+# explicitly.
+if 'CC' not in os.environ and shutil.which('ccache'):
+  cvars['CC'] = 'ccache ' + cvars['CC']
+
 # Determine the current version of the package. The easiest way would be to
 # import "googleclouddebugger" and read its __version__ attribute.
 # Unfortunately we can't do that because "googleclouddebugger" depends on
 # "cdbg_native" that hasn't been built yet.
-version = None
 with open('googleclouddebugger/version.py', 'r') as version_file:
-  version_pattern = re.compile(r"^\s*__version__\s*=\s*'([0-9.]*)'")
-  for line in version_file:
-    match = version_pattern.match(line)
-    if match:
-      version = match.groups()[0]
-assert version
+  version_match = re.search(r"^\s*__version__\s*=\s*'([0-9.]*)'",
+                            version_file.read(), re.MULTILINE)
+assert version_match
+version = version_match.group(1)
+
+# Link time optimization lets the compiler inline across the translation units
+# of the native module. Only the module init function needs to be exported.
+# Builds for a specific machine can add e.g. -march=native, or opt out with
+# -fno-lto, through extra_compile_args and extra_link_args in setup.cfg.
+optimization_compile_args = ['-flto', '-fvisibility=hidden']
+
+# The native module neither throws nor catches C++ exceptions and doesn't use
+# dynamic_cast or typeid, so it does not need unwind tables or RTTI. Use
+# -fexceptions and -frtti in setup.cfg to bring them back if ever needed.
+optimization_compile_args += ['-fno-exceptions', '-fno-rtti']
+optimization_link_args = ['-flto']
+
+# Put every function and variable in its own section, so that the GNU linker
+# can drop the unreferenced ones (e.g. from the static glog and gflags).
+if sys.platform.startswith('linux'):
+  optimization_compile_args += ['-ffunction-sections', '-fdata-sections']
+  optimization_link_args += ['-Wl,--gc-sections']
 
 cdbg_native_module = Extension(
     'googleclouddebugger.cdbg_native',
-    sources=glob('googleclouddebugger/*.cc'),
+    sources=sorted(glob('googleclouddebugger/*.cc')),
     extra_compile_args=[
         '-std=c++0x',
         '-Werror',
         '-g0',
         '-O3',
-    ] + extra_compile_args,
-    extra_link_args=static_libs + extra_link_args,
-    libraries=['rt'])
+    ] + optimization_compile_args + extra_compile_args,
+    extra_link_args=static_libs + optimization_link_args + extra_link_args,
+    libraries=['rt'] if NeedsLibRt() else [])
 
 setup(
     name='google-python-cloud-debugger',
@@ -106,6 +225,7 @@ setup(
     ],
     packages=['googleclouddebugger'],
     ext_modules=[cdbg_native_module],
+    cmdclass={'build_ext': BuildExt},
     license='Apache License, Version 2.0',
     keywords='google cloud debugger',
     classifiers=[
@@ -1,15 +1,27 @@
 """Unit test for backoff module."""
 
+import collections
+import math
+import random
+
 from absl.testing import absltest
 
 from googleclouddebugger import backoff
 
 
+class UpperBoundRandom(object):
+  """Fake random number generator always picking the upper bound."""
+
+  def uniform(self, a, b):
+    del a  # Unused.
+    return b
+
+
 class BackoffTest(absltest.TestCase):
   """Unit test for backoff module."""
 
   def setUp(self):
-    self._backoff = backoff.Backoff(10, 100, 1.5)
+    self._backoff = backoff.Backoff(10, 100, 1.5, rng=UpperBoundRandom())
 
   def testInitial(self):
     self.assertEqual(10, self._backoff.Failed())
@@ -30,6 +42,52 @@ class BackoffTest(absltest.TestCase):
     self._backoff.Succeeded()
     self.assertEqual(10, self._backoff.Failed())
 
+  def testJitter(self):
+    jittered_backoff = backoff.Backoff(10, 100, 1.5, rng=random.Random(0))
+    intervals = [jittered_backoff.Failed() for _ in range(100)]
+
+    self.assertBetween(intervals[0], 0, 10)
+    self.assertBetween(intervals[1], 0, 15)
+    for interval in intervals:
+      self.assertBetween(interval, 0, 100)
+    self.assertGreater(len(set(intervals)), 1)
+
+
+class SlotBackoffTest(absltest.TestCase):
+  """Unit test for SlotBackoff class."""
+
+  def setUp(self):
+    self._backoff = backoff.SlotBackoff(5, 8, rng=random.Random(0))
+
+  def testInitial(self):
+    for _ in range(20):
+      self._backoff.Succeeded()
+      self.assertIn(self._backoff.Failed(), (0, 5))
+
+  def testMaximum(self):
+    for _ in range(100):
+      self.assertIn(self._backoff.Failed(), range(0, 40, 5))
+
+  def testResetOnSuccess(self):
+    for _ in range(4):
+      self._backoff.Failed()
+    self._backoff.Succeeded()
+    self.assertIn(self._backoff.Failed(), (0, 5))
+
+  def testSlotSpread(self):
+    for _ in range(3):
+      self._backoff.Failed()
+
+    draws = 1000
+    counts = collections.Counter(self._backoff.Failed() for _ in range(draws))
+
+    # Each of the 8 slots should be picked with probability 1/8.
+    expected = draws / 8
+    sigma = math.sqrt(draws * (1 / 8) * (7 / 8))
+    self.assertCountEqual(range(0, 40, 5), counts)
+    for count in counts.values():
+      self.assertBetween(count, expected - 3 * sigma, expected + 3 * sigma)
+
 
 if __name__ == '__main__':
   absltest.main()
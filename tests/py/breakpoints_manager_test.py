@@ -9,44 +9,63 @@ from absl.testing import absltest
 from googleclouddebugger import breakpoints_manager
 
 
+# Fixed current time for the expiration tests.
+_BASE_TIME = datetime(2015, 1, 1)
+
+
+def _BreakpointsData(*numbers):
+  """Returns the list of breakpoint definitions with IDs 'ID<number>'."""
+  return [{'id': 'ID%d' % number} for number in numbers]
+
+
 class BreakpointsManagerTest(absltest.TestCase):
   """Unit test for breakpoints_manager module."""
 
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+
+    # The patch is shared by all tests and reset before each one.
+    path = 'googleclouddebugger.breakpoints_manager.'
+    breakpoint_class = path + 'python_breakpoint.PythonBreakpoint'
+
+    cls._patcher = mock.patch(breakpoint_class)
+    cls._shared_mock_breakpoint = cls._patcher.start()
+
+  @classmethod
+  def tearDownClass(cls):
+    cls._patcher.stop()
+    super().tearDownClass()
+
   def setUp(self):
     self._breakpoints_manager = breakpoints_manager.BreakpointsManager(
         self, None)
 
-    path = 'googleclouddebugger.breakpoints_manager.'
-    breakpoint_class = path + 'python_breakpoint.PythonBreakpoint'
+    self._mock_breakpoint = self._shared_mock_breakpoint
+    self._mock_breakpoint.reset_mock(return_value=True, side_effect=True)
 
-    patcher = mock.patch(breakpoint_class)
-    self._mock_breakpoint = patcher.start()
-    self.addCleanup(patcher.stop)
+    # Breakpoints never expire unless a test says otherwise.
+    self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
+        datetime.max)
 
   def testEmpty(self):
     self.assertEmpty(self._breakpoints_manager._active)
 
   def testSetSingle(self):
     self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
-    self._mock_breakpoint.assert_has_calls(
-        [mock.call({'id': 'ID1'}, self, self._breakpoints_manager, None)])
+    self.assertEqual([self._BreakpointCall(1)],
+                     self._mock_breakpoint.call_args_list)
     self.assertLen(self._breakpoints_manager._active, 1)
 
   def testSetDouble(self):
     self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
-    self._mock_breakpoint.assert_has_calls(
-        [mock.call({'id': 'ID1'}, self, self._breakpoints_manager, None)])
+    self.assertEqual([self._BreakpointCall(1)],
+                     self._mock_breakpoint.call_args_list)
     self.assertLen(self._breakpoints_manager._active, 1)
 
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }])
-    self._mock_breakpoint.assert_has_calls([
-        mock.call({'id': 'ID1'}, self, self._breakpoints_manager, None),
-        mock.call({'id': 'ID2'}, self, self._breakpoints_manager, None)
-    ])
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2))
+    self.assertEqual([self._BreakpointCall(1), self._BreakpointCall(2)],
+                     self._mock_breakpoint.call_args_list)
     self.assertLen(self._breakpoints_manager._active, 2)
 
   def testSetRepeated(self):
@@ -54,6 +73,13 @@ class BreakpointsManagerTest(absltest.TestCase):
     self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
     self.assertEqual(1, self._mock_breakpoint.call_count)
 
+  def testSetLarge(self):
+    breakpoints_data = _BreakpointsData(*range(1000))
+    self._breakpoints_manager.SetActiveBreakpoints(breakpoints_data)
+    self._breakpoints_manager.SetActiveBreakpoints(breakpoints_data)
+    self.assertEqual(1000, self._mock_breakpoint.call_count)
+    self.assertLen(self._breakpoints_manager._active, 1000)
+
   def testClear(self):
     self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
     self._breakpoints_manager.SetActiveBreakpoints([])
@@ -80,52 +106,24 @@ class BreakpointsManagerTest(absltest.TestCase):
     self.assertEqual(1, self._mock_breakpoint.call_count)
 
   def testMultipleSetDelete(self):
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }, {
-        'id': 'ID3'
-    }, {
-        'id': 'ID4'
-    }])
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2, 3, 4))
     self.assertLen(self._breakpoints_manager._active, 4)
 
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }, {
-        'id': 'ID3'
-    }, {
-        'id': 'ID4'
-    }])
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2, 3, 4))
     self.assertLen(self._breakpoints_manager._active, 4)
 
     self._breakpoints_manager.SetActiveBreakpoints([])
     self.assertEmpty(self._breakpoints_manager._active)
 
   def testCombination(self):
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }, {
-        'id': 'ID3'
-    }])
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2, 3))
     self.assertLen(self._breakpoints_manager._active, 3)
 
     self._breakpoints_manager.CompleteBreakpoint('ID2')
     self.assertEqual(1, self._mock_breakpoint.return_value.Clear.call_count)
     self.assertLen(self._breakpoints_manager._active, 2)
 
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID2'
-    }, {
-        'id': 'ID3'
-    }, {
-        'id': 'ID4'
-    }])
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(2, 3, 4))
     self.assertEqual(2, self._mock_breakpoint.return_value.Clear.call_count)
     self.assertLen(self._breakpoints_manager._active, 2)
 
@@ -141,89 +139,111 @@ class BreakpointsManagerTest(absltest.TestCase):
     self._breakpoints_manager.CheckBreakpointsExpiration()
 
   def testCheckNotExpired(self):
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }])
+    self._FreezeTime(_BASE_TIME)
     self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-        datetime.utcnow() + timedelta(minutes=1))
+        _BASE_TIME + timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2))
     self._breakpoints_manager.CheckBreakpointsExpiration()
     self.assertEqual(
         0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
   def testCheckExpired(self):
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }])
+    self._FreezeTime(_BASE_TIME)
     self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-        datetime.utcnow() - timedelta(minutes=1))
+        _BASE_TIME - timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2))
     self._breakpoints_manager.CheckBreakpointsExpiration()
     self.assertEqual(
         2, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-  def testCheckExpirationReset(self):
-    self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
+  def testCheckExpirationNewBreakpoint(self):
+    self._FreezeTime(_BASE_TIME)
     self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-        datetime.utcnow() + timedelta(minutes=1))
+        _BASE_TIME + timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
     self._breakpoints_manager.CheckBreakpointsExpiration()
     self.assertEqual(
         0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-    self._breakpoints_manager.SetActiveBreakpoints([{
-        'id': 'ID1'
-    }, {
-        'id': 'ID2'
-    }])
+    # Only the new breakpoint has already expired.
     self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-        datetime.utcnow() - timedelta(minutes=1))
+        _BASE_TIME - timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints(_BreakpointsData(1, 2))
     self._breakpoints_manager.CheckBreakpointsExpiration()
     self.assertEqual(
-        2, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
+        1, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-  def testCheckExpirationCacheNegative(self):
-    base = datetime(2015, 1, 1)
-
-    with mock.patch.object(breakpoints_manager.BreakpointsManager,
-                           'GetCurrentTime') as mock_time:
-      mock_time.return_value = base
+  def testCheckExpirationTimeReadOnce(self):
+    self._FreezeTime(_BASE_TIME)
+    self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
+        _BASE_TIME + timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
 
-      self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
-      self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-          base + timedelta(minutes=1))
+    self._breakpoints_manager.CheckBreakpointsExpiration()
+    self.assertEqual(
+        0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-      self._breakpoints_manager.CheckBreakpointsExpiration()
-      self.assertEqual(
-          0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
+    # The expiration time is only read when the breakpoint is created, so this
+    # should have no effect.
+    self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
+        _BASE_TIME - timedelta(minutes=1))
+    self._breakpoints_manager.CheckBreakpointsExpiration()
+    self.assertEqual(
+        0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
+    self.assertEqual(
+        1, self._mock_breakpoint.return_value.GetExpirationTime.call_count)
 
-      # The nearest expiration time is cached, so this should have no effect.
-      self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-          base - timedelta(minutes=1))
-      self._breakpoints_manager.CheckBreakpointsExpiration()
-      self.assertEqual(
-          0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
+  def testCheckExpirationLater(self):
+    mock_time = self._FreezeTime(_BASE_TIME)
+    self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
+        _BASE_TIME + timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
 
-  def testCheckExpirationCachePositive(self):
-    base = datetime(2015, 1, 1)
+    self._breakpoints_manager.CheckBreakpointsExpiration()
+    self.assertEqual(
+        0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-    with mock.patch.object(breakpoints_manager.BreakpointsManager,
-                           'GetCurrentTime') as mock_time:
-      self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
-      self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
-          base + timedelta(minutes=1))
+    mock_time.return_value = _BASE_TIME + timedelta(minutes=2)
+    self._breakpoints_manager.CheckBreakpointsExpiration()
+    self.assertEqual(
+        1, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-      mock_time.return_value = base
-      self._breakpoints_manager.CheckBreakpointsExpiration()
-      self.assertEqual(
-          0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
+    # The breakpoint only expires once.
+    self._breakpoints_manager.CheckBreakpointsExpiration()
+    self.assertEqual(
+        1, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
-      mock_time.return_value = base + timedelta(minutes=2)
-      self._breakpoints_manager.CheckBreakpointsExpiration()
-      self.assertEqual(
-          1, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
+  def testCheckExpirationRemovedBreakpoint(self):
+    self._FreezeTime(_BASE_TIME)
+    self._mock_breakpoint.return_value.GetExpirationTime.return_value = (
+        _BASE_TIME - timedelta(minutes=1))
+    self._breakpoints_manager.SetActiveBreakpoints([{'id': 'ID1'}])
+    self._breakpoints_manager.SetActiveBreakpoints([])
+    self._breakpoints_manager.CheckBreakpointsExpiration()
+    self.assertEqual(
+        0, self._mock_breakpoint.return_value.ExpireBreakpoint.call_count)
 
+  def _BreakpointCall(self, number):
+    """Returns the expected PythonBreakpoint call for 'ID<number>'."""
+    return mock.call(
+        _BreakpointsData(number)[0], self, self._breakpoints_manager, None)
+
+  def _FreezeTime(self, current_time):
+    """Makes BreakpointsManager.GetCurrentTime return current_time.
+
+    Args:
+      current_time: time to return until the end of the test.
+
+    Returns:
+      The GetCurrentTime mock, to move the time later on.
+    """
+    patcher = mock.patch.object(
+        breakpoints_manager.BreakpointsManager,
+        'GetCurrentTime',
+        return_value=current_time)
+    mock_time = patcher.start()
+    self.addCleanup(patcher.stop)
+    return mock_time
 
 if __name__ == '__main__':
   absltest.main()
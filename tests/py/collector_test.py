@@ -1,37 +1,79 @@
 """Unit test for collector module."""
 
-import copy
 import datetime
-import inspect
 import logging
 import os
 import sys
 import time
-from unittest import mock
 
 from absl.testing import absltest
+from absl.testing import parameterized
 
+from googleclouddebugger import cdbg_native as native
 from googleclouddebugger import collector
 from googleclouddebugger import labels
 
+# Unlike inspect.currentframe(), this is the C function itself, so calling it
+# doesn't add any Python level overhead to the collection sites below.
+_GetFrame = sys._getframe  # pylint: disable=protected-access
+
 LOGPOINT_PAUSE_MSG = (
     'LOGPOINT: Logpoint is paused due to high log rate until log '
     'quota is restored')
 
+# Breakpoint location for CaptureCollectorWithDefaultLocation. CaptureCollector
+# deep copies its definition, so it is safe to share. LogCollector keeps the
+# definition as is and tests modify its location, so it gets a fresh one.
+_DEFAULT_LOCATION = {'path': 'collector_test.py', 'line': 10}
+
+# Inputs and expected values that don't depend on the test. Tests must not
+# mutate them.
+_BIG_LIST = ['x'] * 10000
+
+_BIG_DICT = {'item' + str(i): i**2 for i in range(26)}
+
+# Distinct 10000 character strings for the buffer full tests.
+_PAYLOADS = tuple(str(i) * 10000 for i in range(1, 7))
+
+_LIST_ITEMS_LIMIT_MEMBER = {
+    'status': {
+        'refersTo': 'VARIABLE_VALUE',
+        'description': {
+            'format': ('Only first $0 items were captured. Use in an '
+                       'expression to see all items.'),
+            'parameters': ['25']
+        }
+    }
+}
+
+_HUNDRED_INTS_MEMBERS = [{
+    'type': 'int',
+    'value': str(i),
+    'name': '[{0}]'.format(i)
+} for i in range(100)]
+
 
 def CaptureCollectorWithDefaultLocation(definition,
-                                        data_visibility_policy=None):
-  """Makes a LogCollector with a default location.
+                                        data_visibility_policy=None,
+                                        max_frames=1):
+  """Makes a CaptureCollector with a default location.
+
+  Most tests only look at the top frame, so by default the collector doesn't
+  walk the rest of the test runner call stack.
 
   Args:
     definition: the rest of the breakpoint definition
     data_visibility_policy: optional visibility policy
+    max_frames: maximum number of stack frames to capture
 
   Returns:
-    A LogCollector
+    A CaptureCollector
   """
-  definition['location'] = {'path': 'collector_test.py', 'line': 10}
-  return collector.CaptureCollector(definition, data_visibility_policy)
+  definition['location'] = _DEFAULT_LOCATION
+  capture_collector = collector.CaptureCollector(definition,
+                                                 data_visibility_policy)
+  capture_collector.max_frames = max_frames
+  return capture_collector
 
 
 def LogCollectorWithDefaultLocation(definition):
@@ -47,24 +89,67 @@ def LogCollectorWithDefaultLocation(definition):
   return collector.LogCollector(definition)
 
 
-class CaptureCollectorTest(absltest.TestCase):
+def _FrameWithLocals(**variables):
+  """Returns a frame that has nothing but the given variables as its locals.
+
+  Collecting a test method frame also captures the test case instance through
+  "self", which is most of the work and irrelevant to most tests.
+  """
+  return eval('_GetFrame()', globals(), variables)  # pylint: disable=eval-used
+
+
+class _StubDataVisibilityPolicy(object):
+  """Data visibility policy that defers to the given function."""
+
+  def __init__(self, is_data_visible):
+    self.IsDataVisible = is_data_visible  # pylint: disable=invalid-name
+
+
+# Methods for CaptureCollectorTest.testMethodArguments. Each one returns its own
+# frame, so that the test can capture it with nothing but the arguments in it.
+def _SimpleArguments(unused_a, unused_b):
+  return _GetFrame()
+
+
+def _SelfFirst(self, unused_a, unused_b):  # pylint: disable=unused-argument
+  return _GetFrame()
+
+
+def _SelfLast(unused_a, unused_b, self):  # pylint: disable=unused-argument
+  return _GetFrame()
+
+
+def _OptionalArguments(unused_a, unused_optional='notneeded'):
+  return _GetFrame()
+
+
+def _PositionalArguments(*unused_pos):
+  return _GetFrame()
+
+
+def _Keywords(**unused_kwd):
+  return _GetFrame()
+
+
+class CaptureCollectorTest(parameterized.TestCase):
   """Unit test for capture collector."""
 
-  def tearDown(self):
-    collector.CaptureCollector.pretty_printers = []
+  def setUp(self):
+    # Maps frame number to (locals list, locals by name) for _LocalByName.
+    self._locals_index = {}
 
   def testCallStackUnlimitedFrames(self):
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.max_frames = 1000
-    self._collector.Collect(inspect.currentframe())
+    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'},
+                                                          max_frames=1000)
+    self._collector.Collect(_GetFrame())
 
     self.assertGreater(len(self._collector.breakpoint['stackFrames']), 1)
     self.assertLess(len(self._collector.breakpoint['stackFrames']), 100)
 
   def testCallStackLimitedFrames(self):
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.max_frames = 2
-    self._collector.Collect(inspect.currentframe())
+    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'},
+                                                          max_frames=2)
+    self._collector.Collect(_GetFrame())
 
     self.assertLen(self._collector.breakpoint['stackFrames'], 2)
 
@@ -75,7 +160,7 @@ class CaptureCollectorTest(absltest.TestCase):
     self.assertGreater(top_frame['location']['line'], 1)
 
     frame_below = self._collector.breakpoint['stackFrames'][1]
-    frame_below_line = inspect.currentframe().f_back.f_lineno
+    frame_below_line = _GetFrame(1).f_lineno
     self.assertEqual(frame_below_line, frame_below['location']['line'])
 
   def testCallStackLimitedExpandedFrames(self):
@@ -83,10 +168,10 @@ class CaptureCollectorTest(absltest.TestCase):
     def CountLocals(frame):
       return len(frame['arguments']) + len(frame['locals'])
 
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.max_frames = 3
+    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'},
+                                                          max_frames=3)
     self._collector.max_expand_frames = 2
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     frames = self._collector.breakpoint['stackFrames']
     self.assertLen(frames, 3)
@@ -94,78 +179,123 @@ class CaptureCollectorTest(absltest.TestCase):
     self.assertGreater(CountLocals(frames[1]), 1)
     self.assertEqual(0, CountLocals(frames[2]))
 
-  def testSimpleArguments(self):
-
-    def Method(unused_a, unused_b):
-      self._collector.Collect(inspect.currentframe())
-      top_frame = self._collector.breakpoint['stackFrames'][0]
-      self.assertListEqual([{
-          'name': 'unused_a',
-          'value': '158',
-          'type': 'int'
-      }, {
-          'name': 'unused_b',
-          'value': "'hello'",
-          'type': 'str'
-      }], top_frame['arguments'])
-      self.assertEqual('Method', top_frame['function'])
-
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    Method(158, 'hello')
-
-  def testMethodWithFirstArgumentNamedSelf(self):
-    this = self
-
-    def Method(self, unused_a, unused_b):  # pylint: disable=unused-argument
-      this._collector.Collect(inspect.currentframe())
-      top_frame = this._collector.breakpoint['stackFrames'][0]
-      this.assertListEqual([{
-          'name': 'self',
-          'value': "'world'",
-          'type': 'str'
-      }, {
-          'name': 'unused_a',
-          'value': '158',
-          'type': 'int'
-      }, {
-          'name': 'unused_b',
-          'value': "'hello'",
-          'type': 'str'
-      }], top_frame['arguments'])
-      # This is the incorrect function name, but we are validating that no
-      # exceptions are thrown here.
-      this.assertEqual('str.Method', top_frame['function'])
-
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    Method('world', 158, 'hello')
-
-  def testMethodWithArgumentNamedSelf(self):
-    this = self
-
-    def Method(unused_a, unused_b, self):  # pylint: disable=unused-argument
-      this._collector.Collect(inspect.currentframe())
-      top_frame = this._collector.breakpoint['stackFrames'][0]
-      this.assertListEqual([{
-          'name': 'unused_a',
-          'value': '158',
-          'type': 'int'
-      }, {
-          'name': 'unused_b',
-          'value': "'hello'",
-          'type': 'str'
-      }, {
-          'name': 'self',
-          'value': "'world'",
-          'type': 'str'
-      }], top_frame['arguments'])
-      this.assertEqual('Method', top_frame['function'])
-
+  @parameterized.named_parameters(
+      dict(
+          testcase_name='SimpleArguments',
+          method=_SimpleArguments,
+          args=(158, 'hello'),
+          expected_arguments=[{
+              'name': 'unused_a',
+              'value': '158',
+              'type': 'int'
+          }, {
+              'name': 'unused_b',
+              'value': "'hello'",
+              'type': 'str'
+          }],
+          expected_function='_SimpleArguments'),
+      # The function name is incorrect here, but we are validating that no
+      # exceptions are thrown.
+      dict(
+          testcase_name='FirstArgumentNamedSelf',
+          method=_SelfFirst,
+          args=('world', 158, 'hello'),
+          expected_arguments=[{
+              'name': 'self',
+              'value': "'world'",
+              'type': 'str'
+          }, {
+              'name': 'unused_a',
+              'value': '158',
+              'type': 'int'
+          }, {
+              'name': 'unused_b',
+              'value': "'hello'",
+              'type': 'str'
+          }],
+          expected_function='str._SelfFirst'),
+      dict(
+          testcase_name='ArgumentNamedSelf',
+          method=_SelfLast,
+          args=(158, 'hello', 'world'),
+          expected_arguments=[{
+              'name': 'unused_a',
+              'value': '158',
+              'type': 'int'
+          }, {
+              'name': 'unused_b',
+              'value': "'hello'",
+              'type': 'str'
+          }, {
+              'name': 'self',
+              'value': "'world'",
+              'type': 'str'
+          }],
+          expected_function='_SelfLast'),
+      dict(
+          testcase_name='OptionalArguments',
+          method=_OptionalArguments,
+          args=(object(),),
+          expected_arguments=[{
+              'name': 'unused_a',
+              'varTableIndex': 1
+          }, {
+              'name': 'unused_optional',
+              'value': "'notneeded'",
+              'type': 'str'
+          }],
+          expected_function='_OptionalArguments'),
+      dict(
+          testcase_name='PositionalArguments',
+          method=_PositionalArguments,
+          args=(1,),
+          expected_arguments=[{
+              'name': 'unused_pos',
+              'type': 'tuple',
+              'members': [{
+                  'name': '[0]',
+                  'value': '1',
+                  'type': 'int'
+              }]
+          }],
+          expected_function='_PositionalArguments'),
+      dict(
+          testcase_name='Keywords',
+          method=_Keywords,
+          kwargs={
+              'first': 1,
+              'second': 2
+          },
+          expected_arguments=[{
+              'name': 'unused_kwd',
+              'type': 'dict',
+              'members': [{
+                  'name': "'first'",
+                  'value': '1',
+                  'type': 'int'
+              }, {
+                  'name': "'second'",
+                  'value': '2',
+                  'type': 'int'
+              }]
+          }],
+          expected_function='_Keywords'),
+  )
+  def testMethodArguments(self,
+                          method,
+                          expected_arguments,
+                          expected_function,
+                          args=(),
+                          kwargs=None):
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    Method(158, 'hello', 'world')
+    self._collector.Collect(method(*args, **(kwargs or {})))
+    top_frame = self._collector.breakpoint['stackFrames'][0]
+    self.assertListEqual(expected_arguments, top_frame['arguments'])
+    self.assertEqual(expected_function, top_frame['function'])
 
   def testClassMethod(self):
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
     top_frame = self._collector.breakpoint['stackFrames'][0]
     self.assertListEqual([{
         'name': 'self',
@@ -174,65 +304,9 @@ class CaptureCollectorTest(absltest.TestCase):
     self.assertEqual('CaptureCollectorTest.testClassMethod',
                      top_frame['function'])
 
-  def testClassMethodWithOptionalArguments(self):
-
-    def Method(unused_a, unused_optional='notneeded'):
-      self._collector.Collect(inspect.currentframe())
-      top_frame = self._collector.breakpoint['stackFrames'][0]
-      self.assertListEqual([{
-          'name': 'unused_a',
-          'varTableIndex': 1
-      }, {
-          'name': 'unused_optional',
-          'value': "'notneeded'",
-          'type': 'str'
-      }], top_frame['arguments'])
-      self.assertEqual('Method', top_frame['function'])
-
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    Method(self)
-
-  def testClassMethodWithPositionalArguments(self):
-
-    def Method(*unused_pos):
-      self._collector.Collect(inspect.currentframe())
-      top_frame = self._collector.breakpoint['stackFrames'][0]
-      self.assertListEqual([{
-          'name': 'unused_pos',
-          'type': 'tuple',
-          'members': [{
-              'name': '[0]',
-              'value': '1',
-              'type': 'int'
-          }]
-      }], top_frame['arguments'])
-      self.assertEqual('Method', top_frame['function'])
-
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    Method(1)
-
-  def testClassMethodWithKeywords(self):
-
-    def Method(**unused_kwd):
-      self._collector.Collect(inspect.currentframe())
-      top_frame = self._collector.breakpoint['stackFrames'][0]
-      self.assertCountEqual([{
-          'name': "'first'",
-          'value': '1',
-          'type': 'int'
-      }, {
-          'name': "'second'",
-          'value': '2',
-          'type': 'int'
-      }], top_frame['arguments'][0]['members'])
-      self.assertEqual('Method', top_frame['function'])
-
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    Method(first=1, second=2)
-
   def testNoLocalVariables(self):
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
     top_frame = self._collector.breakpoint['stackFrames'][0]
     self.assertEmpty(top_frame['locals'])
     self.assertEqual('CaptureCollectorTest.testNoLocalVariables',
@@ -257,7 +331,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_a = BadType()
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     var_a = self._Pack(self._LocalByName('unused_a'))
     self.assertDictEqual(
@@ -289,7 +363,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_a = BadType()
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     var_a = self._Pack(self._LocalByName('unused_a'))
     members = var_a['members']
@@ -315,7 +389,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_s = 'hippo'
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
     top_frame = self._collector.breakpoint['stackFrames'][0]
     self.assertLen(top_frame['arguments'], 1)  # just self.
     self.assertCountEqual([{
@@ -339,19 +413,16 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_a = collector.LineNoFilter()
     unused_b = 5
 
-    # Side effect logic for the mock data visibility object
+    # Logic for the stub data visibility policy.
     def IsDataVisible(name):
       path_prefix = 'googleclouddebugger.collector.'
       if name == path_prefix + 'LineNoFilter':
         return (False, 'data blocked')
       return (True, None)
 
-    mock_policy = mock.MagicMock()
-    mock_policy.IsDataVisible.side_effect = IsDataVisible
-
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'},
-                                                          mock_policy)
-    self._collector.Collect(inspect.currentframe())
+    self._collector = CaptureCollectorWithDefaultLocation(
+        {'id': 'BP_ID'}, _StubDataVisibilityPolicy(IsDataVisible))
+    self._collector.Collect(_GetFrame())
     top_frame = self._collector.breakpoint['stackFrames'][0]
     # Should be blocked
     self.assertIn(
@@ -381,21 +452,18 @@ class CaptureCollectorTest(absltest.TestCase):
 
     unused_a = TestClass()
 
-    # Side effect logic for the mock data visibility object
+    # Logic for the stub data visibility policy.
     def IsDataVisible(name):
       if name == 'collector_test.TestClass':
         return (False, 'data blocked')
       return (True, None)
 
-    mock_policy = mock.MagicMock()
-    mock_policy.IsDataVisible.side_effect = IsDataVisible
-
     self._collector = CaptureCollectorWithDefaultLocation(
         {
             'id': 'BP_ID',
             'expressions': ['unused_a', 'unused_a.a']
-        }, mock_policy)
-    self._collector.Collect(inspect.currentframe())
+        }, _StubDataVisibilityPolicy(IsDataVisible))
+    self._collector.Collect(_GetFrame())
     # Class should be blocked
     self.assertIn(
         {
@@ -420,7 +488,7 @@ class CaptureCollectorTest(absltest.TestCase):
   def testLocalsNonTopFrame(self):
 
     def Method():
-      self._collector.Collect(inspect.currentframe())
+      self._collector.Collect(_GetFrame())
       self.assertListEqual([{
           'name': 'self',
           'varTableIndex': 1
@@ -435,19 +503,17 @@ class CaptureCollectorTest(absltest.TestCase):
       }], self._collector.breakpoint['stackFrames'][1]['locals'])
 
     unused_a = 47
-    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
+    self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'},
+                                                          max_frames=2)
     Method()
 
   def testDictionaryMaxDepth(self):
-    d = {}
-    t = d
-    for _ in range(10):
-      t['inner'] = {}
-      t = t['inner']
+    # One level deeper than the max_depth set below.
+    d = {'inner': {'inner': {'inner': {}}}}
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
     self._collector.default_capture_limits.max_depth = 3
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(d=d))
     self.assertDictEqual(
         {
             'name':
@@ -465,15 +531,12 @@ class CaptureCollectorTest(absltest.TestCase):
         }, self._LocalByName('d'))
 
   def testVectorMaxDepth(self):
-    l = []
-    t = l
-    for _ in range(10):
-      t.append([])
-      t = t[0]
+    # One level deeper than the max_depth set below.
+    l = [[[[]]]]
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
     self._collector.default_capture_limits.max_depth = 3
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(l=l))
     self.assertDictEqual(
         {
             'name':
@@ -494,7 +557,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_s = '123456789'
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
     self._collector.default_capture_limits.max_value_len = 8
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_s=unused_s))
     self.assertListEqual([{
         'name': 'unused_s',
         'value': "'12345678...",
@@ -505,7 +568,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_bytes = bytearray(range(20))
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
     self._collector.default_capture_limits.max_value_len = 20
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_bytes=unused_bytes))
     self.assertListEqual([{
         'name': 'unused_bytes',
         'value': r"bytearray(b'\x00\x01\...",
@@ -522,7 +585,7 @@ class CaptureCollectorTest(absltest.TestCase):
 
     unused_my = MyClass()
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_my=unused_my))
     var_index = self._LocalByName('unused_my')['varTableIndex']
     self.assertEqual(
         __name__ + '.MyClass',
@@ -545,18 +608,17 @@ class CaptureCollectorTest(absltest.TestCase):
         self.data = data
 
     def Method():
-      unused_m1 = MyClass('1' * 10000)
-      unused_m2 = MyClass('2' * 10000)
-      unused_m3 = MyClass('3' * 10000)
-      unused_m4 = MyClass('4' * 10000)
-      unused_m5 = MyClass('5' * 10000)
-      unused_m6 = MyClass('6' * 10000)
+      unused_m1 = MyClass(_PAYLOADS[0])
+      unused_m2 = MyClass(_PAYLOADS[1])
+      unused_m3 = MyClass(_PAYLOADS[2])
+      unused_m4 = MyClass(_PAYLOADS[3])
+      unused_m5 = MyClass(_PAYLOADS[4])
+      unused_m6 = MyClass(_PAYLOADS[5])
 
       self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-      self._collector.max_frames = 1
       self._collector.max_size = 48000
       self._collector.default_capture_limits.max_value_len = 10009
-      self._collector.Collect(inspect.currentframe())
+      self._collector.Collect(_GetFrame())
 
       # Verify that 5 locals fit and 1 is out of buffer.
       count = {True: 0, False: 0}  # captured, not captured
@@ -578,14 +640,13 @@ class CaptureCollectorTest(absltest.TestCase):
         self.data = data
 
     def Method():
-      unused_d1 = {'a': MyClass('1' * 10000)}
-      unused_d2 = {'b': MyClass('2' * 10000)}
+      unused_d1 = {'a': MyClass(_PAYLOADS[0])}
+      unused_d2 = {'b': MyClass(_PAYLOADS[1])}
 
       self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-      self._collector.max_frames = 1
       self._collector.max_size = 9000
       self._collector.default_capture_limits.max_value_len = 10009
-      self._collector.Collect(inspect.currentframe())
+      self._collector.Collect(_GetFrame())
 
       # Verify that one of {d1,d2} could fit and the other didn't.
       var_indexes = [
@@ -607,7 +668,7 @@ class CaptureCollectorTest(absltest.TestCase):
     m2.other = m1
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(m1=m1, m2=m2))
 
     m1_var_index = self._LocalByName('m1')['varTableIndex']
     m2_var_index = self._LocalByName('m2')['varTableIndex']
@@ -635,7 +696,9 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_my_slice = unused_my_list[1:4]
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(
+        _FrameWithLocals(unused_my_list=unused_my_list,
+                         unused_my_slice=unused_my_slice))
 
     self.assertDictEqual(
         {
@@ -700,7 +763,7 @@ class CaptureCollectorTest(absltest.TestCase):
     }
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_my_dict=unused_my_dict))
 
     frozenset_name = 'frozenset({5, 6})'
     self.assertCountEqual([{
@@ -767,7 +830,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_dict['\x88'] = '\x88'
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_dict=unused_dict))
 
     unicode_type = 'str'
     unicode_name = "'\xe0'"
@@ -785,10 +848,10 @@ class CaptureCollectorTest(absltest.TestCase):
                           self._LocalByName('unused_dict')['members'])
 
   def testOversizedList(self):
-    unused_big_list = ['x'] * 10000
+    unused_big_list = _BIG_LIST
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_big_list=unused_big_list))
 
     members = self._LocalByName('unused_big_list')['members']
 
@@ -798,46 +861,25 @@ class CaptureCollectorTest(absltest.TestCase):
         'value': "'x'",
         'type': 'str'
     }, members[7])
-    self.assertDictEqual(
-        {
-            'status': {
-                'refersTo': 'VARIABLE_VALUE',
-                'description': {
-                    'format': (
-                        'Only first $0 items were captured. Use in an expression'
-                        ' to see all items.'),
-                    'parameters': ['25']
-                }
-            }
-        }, members[25])
+    self.assertDictEqual(_LIST_ITEMS_LIMIT_MEMBER, members[25])
 
   def testOversizedDictionary(self):
-    unused_big_dict = {'item' + str(i): i**2 for i in range(26)}
+    unused_big_dict = _BIG_DICT
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_big_dict=unused_big_dict))
 
     members = self._LocalByName('unused_big_dict')['members']
 
     self.assertLen(members, 26)
-    self.assertDictEqual(
-        {
-            'status': {
-                'refersTo': 'VARIABLE_VALUE',
-                'description': {
-                    'format': (
-                        'Only first $0 items were captured. Use in an expression'
-                        ' to see all items.'),
-                    'parameters': ['25']
-                }
-            }
-        }, members[25])
+    self.assertDictEqual(_LIST_ITEMS_LIMIT_MEMBER, members[25])
 
   def testEmptyDictionary(self):
     unused_empty_dict = {}
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(
+        _FrameWithLocals(unused_empty_dict=unused_empty_dict))
 
     self.assertEqual(
         {
@@ -858,7 +900,7 @@ class CaptureCollectorTest(absltest.TestCase):
   def testEmptyCollection(self):
     for unused_c, object_type in [([], 'list'), ((), 'tuple'), (set(), 'set')]:
       self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-      self._collector.Collect(inspect.currentframe())
+      self._collector.Collect(_GetFrame())
 
       self.assertEqual(
           {
@@ -884,7 +926,8 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_empty_object = EmptyObject()
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(
+        _FrameWithLocals(unused_empty_object=unused_empty_object))
 
     self.assertEqual(
         {
@@ -910,7 +953,7 @@ class CaptureCollectorTest(absltest.TestCase):
         'id': 'BP_ID',
         'expressions': ['1+2', 'unused_dummy_a*8', 'unused_dummy_b']
     })
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
     self.assertListEqual([{
         'name': '1+2',
         'value': '3',
@@ -949,7 +992,7 @@ class CaptureCollectorTest(absltest.TestCase):
     })
     self._collector.max_size = 500
     unused_dummy_a = '|'.join(['%04d' % i for i in range(5, 510, 5)])
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
     self.assertListEqual([{
         'name': 'unused_dummy_a',
         'type': 'str',
@@ -962,18 +1005,12 @@ class CaptureCollectorTest(absltest.TestCase):
         'expressions': ['unused_dummy_a']
     })
     unused_dummy_a = list(range(0, 100))
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
     # Verify that the list did not get truncated.
     self.assertListEqual([{
-        'name':
-            'unused_dummy_a',
-        'type':
-            'list',
-        'members': [{
-            'type': 'int',
-            'value': str(a),
-            'name': '[{0}]'.format(a)
-        } for a in unused_dummy_a]
+        'name': 'unused_dummy_a',
+        'type': 'list',
+        'members': _HUNDRED_INTS_MEMBERS
     }], self._collector.breakpoint['evaluatedExpressions'])
 
   def testExpressionNullBytes(self):
@@ -981,7 +1018,7 @@ class CaptureCollectorTest(absltest.TestCase):
         'id': 'BP_ID',
         'expressions': ['\0']
     })
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     evaluated_expressions = self._collector.breakpoint['evaluatedExpressions']
     self.assertLen(evaluated_expressions, 1)
@@ -992,7 +1029,7 @@ class CaptureCollectorTest(absltest.TestCase):
         'id': 'BP_ID',
         'expressions': ['2+']
     })
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     evaluated_expressions = self._collector.breakpoint['evaluatedExpressions']
     self.assertLen(evaluated_expressions, 1)
@@ -1007,7 +1044,7 @@ class CaptureCollectorTest(absltest.TestCase):
         'id': 'BP_ID',
         'expressions': ['unused_dummy_a/unused_dummy_b']
     })
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     zero_division_msg = 'division by zero'
 
@@ -1034,7 +1071,7 @@ class CaptureCollectorTest(absltest.TestCase):
         'id': 'BP_ID',
         'expressions': ['ChangeA()']
     })
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     self.assertEqual(1, self._a)
     self.assertListEqual([{
@@ -1066,16 +1103,23 @@ class CaptureCollectorTest(absltest.TestCase):
         return None
       return ((('name2_%d' % i, '2_%d' % i) for i in range(3)), 'pp-type2')
 
-    collector.CaptureCollector.pretty_printers += [
-        PrettyPrinter1, PrettyPrinter2
-    ]
+    # This is the only test that registers pretty printers, so it restores
+    # the original list after itself rather than having every test do it.
+    pretty_printers = collector.CaptureCollector.pretty_printers
+    saved_pretty_printers = list(pretty_printers)
+
+    def RestorePrettyPrinters():
+      pretty_printers[:] = saved_pretty_printers
+
+    self.addCleanup(RestorePrettyPrinters)
+    pretty_printers += [PrettyPrinter1, PrettyPrinter2]
 
     unused_obj1 = MyClass()
     unused_obj2 = MyClass()
     unused_obj3 = MyClass()
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_GetFrame())
 
     obj_vars = [
         self._Pack(self._LocalByName('unused_obj%d' % i)) for i in range(1, 4)
@@ -1135,7 +1179,11 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_timedelta = datetime.timedelta(days=3, microseconds=8237)
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(
+        _FrameWithLocals(unused_datetime=unused_datetime,
+                         unused_date=unused_date,
+                         unused_time=unused_time,
+                         unused_timedelta=unused_timedelta))
 
     self.assertDictEqual(
         {
@@ -1169,7 +1217,7 @@ class CaptureCollectorTest(absltest.TestCase):
     unused_exception = ValueError('arg1', 2, [3])
 
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals(unused_exception=unused_exception))
     obj = self._Pack(self._LocalByName('unused_exception'))
 
     self.assertEqual('unused_exception', obj['name'])
@@ -1195,7 +1243,7 @@ class CaptureCollectorTest(absltest.TestCase):
   def testRequestLogIdCapturing(self):
     collector.request_log_id_collector = lambda: 'test_log_id'
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
     self.assertIn('labels', self._collector.breakpoint)
     self.assertEqual(
@@ -1205,17 +1253,17 @@ class CaptureCollectorTest(absltest.TestCase):
   def testRequestLogIdCapturingNoId(self):
     collector.request_log_id_collector = lambda: None
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
   def testRequestLogIdCapturingNoCollector(self):
     collector.request_log_id_collector = None
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
   def testUserIdSuccess(self):
     collector.user_id_collector = lambda: ('mdb_user', 'noogler')
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
     self.assertIn('evaluatedUserId', self._collector.breakpoint)
     self.assertEqual({
@@ -1226,38 +1274,47 @@ class CaptureCollectorTest(absltest.TestCase):
   def testUserIdIsNone(self):
     collector.user_id_collector = lambda: (None, None)
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
     self.assertNotIn('evaluatedUserId', self._collector.breakpoint)
 
   def testUserIdNoKind(self):
     collector.user_id_collector = lambda: (None, 'noogler')
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
     self.assertNotIn('evaluatedUserId', self._collector.breakpoint)
 
   def testUserIdNoValue(self):
     collector.user_id_collector = lambda: ('mdb_user', None)
     self._collector = CaptureCollectorWithDefaultLocation({'id': 'BP_ID'})
-    self._collector.Collect(inspect.currentframe())
+    self._collector.Collect(_FrameWithLocals())
 
     self.assertNotIn('evaluatedUserId', self._collector.breakpoint)
 
   def _LocalByName(self, name, frame=0):
-    for local in self._collector.breakpoint['stackFrames'][frame]['locals']:
-      if local['name'] == name:
-        return local
-    self.fail('Local %s not found in frame %d' % (name, frame))
+    frame_locals = self._collector.breakpoint['stackFrames'][frame]['locals']
+    # The index is rebuilt whenever a test collects into a new breakpoint.
+    index = self._locals_index.get(frame)
+    if index is None or index[0] is not frame_locals:
+      index = (frame_locals, {local['name']: local for local in frame_locals})
+      self._locals_index[frame] = index
+
+    local = index[1].get(name)
+    if local is None:
+      self.fail('Local %s not found in frame %d' % (name, frame))
+    return local
 
   def _Pack(self, variable):
     """Embeds variables referenced through var_index."""
-    packed_variable = copy.copy(variable)
-
     var_index = variable.get('varTableIndex')
-    if var_index is not None:
-      packed_variable.update(
-          self._collector.breakpoint['variableTable'][var_index])
+    if var_index is None:
+      packed_variable = dict(variable)
+    else:
+      packed_variable = {
+          **variable,
+          **self._collector.breakpoint['variableTable'][var_index]
+      }
       del packed_variable['varTableIndex']
 
     if 'members' in packed_variable:
@@ -1303,7 +1360,7 @@ class LogCollectorTest(absltest.TestCase):
           True iff the oldest unverified message matches the given attributes.
         """
         record = self._received_records.pop(0)
-        frame = inspect.currentframe().f_back
+        frame = _GetFrame(1)
         if level != record.levelno:
           logging.error('Expected log level %d, got %d (%s)', level,
                         record.levelno, record.levelname)
@@ -1366,16 +1423,22 @@ class LogCollectorTest(absltest.TestCase):
   def ResetGlobalLogQuota(self):
     # The global log quota takes up to 5 seconds to fully fill back up to
     # capacity (kDynamicLogCapacityFactor is 5). The capacity is 5 times the per
-    # second fill rate. The best we can do is a sleep, since the global
-    # leaky_bucket instance is inaccessible to the test.
-    time.sleep(5.0)
+    # second fill rate.
+    self._WaitForGlobalLogQuota(5.0)
 
   def ResetGlobalLogBytesQuota(self):
     # The global log bytes quota takes up to 2 seconds to fully fill back up to
     # capacity (kDynamicLogBytesCapacityFactor is 2). The capacity is twice the
-    # per second fill rate. The best we can do is a sleep, since the global
-    # leaky_bucket instance is inaccessible to the test.
-    time.sleep(2.0)
+    # per second fill rate.
+    self._WaitForGlobalLogQuota(2.0)
+
+  def _WaitForGlobalLogQuota(self, timeout_sec):
+    # Only waits as long as the quota actually needs to recover, which is
+    # usually much less than the worst case.
+    deadline = time.monotonic() + timeout_sec
+    while (not native.IsDynamicLogsQuotaRecovered() and
+           time.monotonic() < deadline):
+      time.sleep(0.01)
 
   def testLogQuota(self):
     # Attempt to get to a known starting state by letting the global quota fully
@@ -1387,7 +1450,7 @@ class LogCollectorTest(absltest.TestCase):
         'expressions': ['i']
     })
     for i in range(0, bucket_max_capacity * 2):
-      self.assertIsNone(log_collector.Log(inspect.currentframe()))
+      self.assertIsNone(log_collector.Log(_GetFrame()))
       if not self._verifier.CheckMessageSafe('LOGPOINT: %s' % i):
         self.assertGreaterEqual(i, bucket_max_capacity,
                                 'Log quota exhausted earlier than expected')
@@ -1395,7 +1458,7 @@ class LogCollectorTest(absltest.TestCase):
             self._verifier.CheckMessageSafe(LOGPOINT_PAUSE_MSG),
             'Quota hit message not logged')
         time.sleep(0.6)
-        self.assertIsNone(log_collector.Log(inspect.currentframe()))
+        self.assertIsNone(log_collector.Log(_GetFrame()))
         self.assertTrue(
             self._verifier.CheckMessageSafe('LOGPOINT: %s' % i),
             'Logging not resumed after quota recovery time')
@@ -1412,17 +1475,17 @@ class LogCollectorTest(absltest.TestCase):
     # very short time frame. So the third 30k message should pause.
     msg = ' ' * 30000
     log_collector = LogCollectorWithDefaultLocation({'logMessageFormat': msg})
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: ' + msg))
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: ' + msg))
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.CheckMessageSafe(LOGPOINT_PAUSE_MSG),
         'Quota hit message not logged')
     time.sleep(0.6)
     log_collector._definition['logMessageFormat'] = 'hello'
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage('LOGPOINT: hello'),
         'Logging was not resumed after quota recovery time')
@@ -1431,7 +1494,7 @@ class LogCollectorTest(absltest.TestCase):
     # Missing is equivalent to INFO.
     log_collector = LogCollectorWithDefaultLocation(
         {'logMessageFormat': 'hello'})
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: hello'))
 
   def testUndefinedLogLevel(self):
@@ -1443,7 +1506,7 @@ class LogCollectorTest(absltest.TestCase):
             'description': {
                 'format': 'Log action on a breakpoint not supported'
             }
-        }, log_collector.Log(inspect.currentframe()))
+        }, log_collector.Log(_GetFrame()))
 
   def testLogInfo(self):
     log_collector = LogCollectorWithDefaultLocation({
@@ -1451,7 +1514,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': 'hello'
     })
     log_collector._definition['location']['line'] = 20
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: hello',
@@ -1463,7 +1526,7 @@ class LogCollectorTest(absltest.TestCase):
         'logLevel': 'WARNING',
         'logMessageFormat': 'hello'
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: hello',
@@ -1475,7 +1538,7 @@ class LogCollectorTest(absltest.TestCase):
         'logLevel': 'ERROR',
         'logMessageFormat': 'hello'
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: hello',
@@ -1488,7 +1551,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': 'a=$0, b=$1',
         'expressions': ['-', '+']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     if sys.version_info.minor < 10:
       self.assertTrue(
           self._verifier.GotMessage(
@@ -1509,7 +1572,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$ $$ $$$ $$$$ $0 $$0 $$$0 $$$$0 $1 hello',
         'expressions': ['unused_integer']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     msg = 'LOGPOINT: $ $ $$ $$ 12345 $0 $12345 $$0 <N/A> hello'
     self.assertTrue(self._verifier.GotMessage(msg))
 
@@ -1518,7 +1581,7 @@ class LogCollectorTest(absltest.TestCase):
         'logLevel': 'INFO',
         'logMessageFormat': 'a=$0'
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: a=<N/A>'))
 
   def testException(self):
@@ -1527,7 +1590,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['[][1]']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: <Exception occurred: list index out of range>'))
@@ -1542,7 +1605,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['MutableMethod()']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: <Exception occurred: Only immutable methods can be called '
@@ -1556,7 +1619,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_none']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: None'))
 
   def testPrimitives(self):
@@ -1569,7 +1632,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0,$1,$2',
         'expressions': ['unused_boolean', 'unused_integer', 'unused_string']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage("LOGPOINT: True,12345,'hello'"))
 
   def testLongString(self):
@@ -1581,7 +1644,7 @@ class LogCollectorTest(absltest.TestCase):
         'expressions': ['unused_string']
     })
     log_collector.max_value_len = 9
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage("LOGPOINT: '123456789..."))
 
   def testLongBytes(self):
@@ -1593,7 +1656,7 @@ class LogCollectorTest(absltest.TestCase):
         'expressions': ['unused_bytes']
     })
     log_collector.max_value_len = 20
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(r"LOGPOINT: bytearray(b'\x00\x01\..."))
 
@@ -1612,7 +1675,7 @@ class LogCollectorTest(absltest.TestCase):
             'unused_datetime', 'unused_date', 'unused_time', 'unused_timedelta'
         ]
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: 2014-06-11 02:30:00;1980-03-01 00:00:00;'
@@ -1626,7 +1689,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_set']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage("LOGPOINT: {'a'}"))
 
   def testTuple(self):
@@ -1637,7 +1700,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_tuple']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: (1, 2, 3, 4, 5)'))
 
   def testList(self):
@@ -1648,7 +1711,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_list']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage("LOGPOINT: ['a', 'b', 'c']"))
 
   def testOversizedList(self):
@@ -1660,7 +1723,7 @@ class LogCollectorTest(absltest.TestCase):
         'expressions': ['unused_list']
     })
     log_collector.max_list_items = 3
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: [1, 2, 3, ...]'))
 
   def testSlice(self):
@@ -1672,7 +1735,7 @@ class LogCollectorTest(absltest.TestCase):
         'expressions': ['unused_slice']
     })
     collector.max_list_items = 3
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage('LOGPOINT: slice(1, 10, None)'))
 
   def testMap(self):
@@ -1683,7 +1746,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_map']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage("LOGPOINT: {'a': 1}"))
 
   def testObject(self):
@@ -1700,7 +1763,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_my']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(self._verifier.GotMessage("LOGPOINT: {'some': 'thing'}"))
 
   def testNestedBelowLimit(self):
@@ -1711,7 +1774,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_list']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: [1, [2], [1, 2, 3], [1, [1, 2, 3]], 5]'))
@@ -1726,7 +1789,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_list']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: [1, [1, 2, 3, 4, 5], [[1, 2, 3, 4, 5], 2, 3, 4, 5], '
@@ -1740,7 +1803,7 @@ class LogCollectorTest(absltest.TestCase):
         'logMessageFormat': '$0',
         'expressions': ['unused_list']
     })
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage('LOGPOINT: [1, [[2, %s], 4], 5]' % type([])))
 
@@ -1755,7 +1818,7 @@ class LogCollectorTest(absltest.TestCase):
     })
     log_collector.max_list_items = 3
     log_collector.max_sublist_items = 3
-    self.assertIsNone(log_collector.Log(inspect.currentframe()))
+    self.assertIsNone(log_collector.Log(_GetFrame()))
     self.assertTrue(
         self._verifier.GotMessage(
             'LOGPOINT: [1, [1, [1, %s, 3, ...], 3, ...], 3, ...]' % list_type))
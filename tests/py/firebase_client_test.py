@@ -13,6 +13,7 @@ from unittest.mock import patch
 import requests
 import requests_mock
 
+from googleclouddebugger import backoff
 from googleclouddebugger import version
 from googleclouddebugger import firebase_client
 
@@ -107,6 +108,23 @@ class FirebaseClientTest(parameterized.TestCase):
   def tearDown(self):
     self._client.Stop()
 
+  def testDefaultBackoff(self):
+    self.assertIsInstance(self._client.connect_backoff, backoff.Backoff)
+    self.assertIsInstance(self._client.update_backoff, backoff.Backoff)
+
+  def testBackoffFactory(self):
+    client = firebase_client.FirebaseClient(backoff_factory=backoff.SlotBackoff)
+    for client_backoff in [
+        client.connect_backoff, client.register_backoff,
+        client.subscribe_backoff, client.update_backoff
+    ]:
+      self.assertIsInstance(client_backoff, backoff.SlotBackoff)
+
+    # Each request type keeps its own state.
+    client.connect_backoff.Failed()
+    self.assertIsNot(client.connect_backoff, client.register_backoff)
+    self.assertEqual(1, client.register_backoff._slots)
+
   def testSetupAuthDefault(self):
     # By default, we try getting the project id from the metadata server.
     # Note that actual credentials are not fetched.
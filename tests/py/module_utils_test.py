@@ -164,5 +164,34 @@ class ModuleUtilsTest(absltest.TestCase):
     self.assertTrue(m1, 'Module not found')
     self.assertEqual('/a/b/p/./m.pyc', m1.__file__)
 
+  def testReplacedLoadedModuleFromSuffix(self):
+    _AddSysModule('m1', '/a/b/p1/m1.pyc')
+    self.assertTrue(module_utils.GetLoadedModuleBySuffix('/a/b/p1/m1.py'))
+
+    # Swap the module for another one without changing sys.modules size.
+    del sys.modules['m1']
+    _AddSysModule('m2', '/a/b/p2/m2.pyc')
+    m2 = module_utils.GetLoadedModuleBySuffix('/a/b/p2/m2.py')
+    self.assertTrue(m2, 'Module not found')
+    self.assertEqual('/a/b/p2/m2.pyc', m2.__file__)
+
+  def testRemovedLoadedModuleFromSuffix(self):
+    _AddSysModule('m1', '/a/b/p1/m1.pyc')
+    self.assertTrue(module_utils.GetLoadedModuleBySuffix('/a/b/p1/m1.py'))
+
+    # Remove the module and add another one without changing sys.modules size.
+    del sys.modules['m1']
+    _AddSysModule('m2', '/a/b/p2/m2.pyc')
+    self.assertIsNone(module_utils.GetLoadedModuleBySuffix('/a/b/p1/m1.py'))
+
+  def testReloadedLoadedModuleFromSuffix(self):
+    _AddSysModule('m1', '/a/b/p1/m1.pyc')
+    self.assertTrue(module_utils.GetLoadedModuleBySuffix('/a/b/p1/m1.py'))
+
+    # Replace the module with a new object under the same name.
+    _AddSysModule('m1', '/a/b/p1/m1.pyc')
+    self.assertIs(sys.modules['m1'],
+                  module_utils.GetLoadedModuleBySuffix('/a/b/p1/m1.py'))
+
 if __name__ == '__main__':
   absltest.main()
@@ -41,6 +41,9 @@ class NativeModuleTest(absltest.TestCase):
 
     self._ClearAllBreakpoints()
 
+  def testIsInfoLogEnabled(self):
+    self.assertIsInstance(native.IsInfoLogEnabled(), bool)
+
   def testUnconditionalBreakpoint(self):
 
     def Trigger():
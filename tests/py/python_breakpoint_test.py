@@ -63,6 +63,17 @@ class PythonBreakpointTest(absltest.TestCase):
     breakpoint.Clear()
     self.assertEqual('BP_ID', breakpoint.GetBreakpointId())
 
+  def testActivateAfterClear(self):
+    breakpoint = python_breakpoint.PythonBreakpoint(
+        dict(self._template, location={
+            'path': 'activate_after_clear.py',
+            'line': 1
+        }), self, self, None)
+    breakpoint.Clear()
+    breakpoint._ActivateBreakpoint(sys.modules[__name__])
+    self.assertIsNone(breakpoint._cookie)
+    self.assertEmpty(self._update_queue)
+
   def testNullBytesInCondition(self):
     python_breakpoint.PythonBreakpoint(
         dict(self._template, condition='\0'), self, self, None)
@@ -71,6 +82,16 @@ class PythonBreakpointTest(absltest.TestCase):
     self.assertTrue(self._update_queue[0]['status']['isError'])
     self.assertTrue(self._update_queue[0]['isFinalState'])
 
+  def testCompileConditionIsCached(self):
+    code, error = python_breakpoint._CompileCondition('a == 1')
+    self.assertIsNone(error)
+    self.assertIs(code, python_breakpoint._CompileCondition('a == 1')[0])
+
+    code, error = python_breakpoint._CompileCondition('2+')
+    self.assertIsNone(code)
+    self.assertIsInstance(error, SyntaxError)
+    self.assertIs(error, python_breakpoint._CompileCondition('2+')[1])
+
   # Test only applies to the old module search algorithm. When using new module
   # search algorithm, this test is same as testDeferredBreakpoint.
   def testUnknownModule(self):
@@ -142,6 +163,42 @@ class PythonBreakpointTest(absltest.TestCase):
 
     self.assertEmpty(imphook._import_callbacks)
 
+  # Verifies that a loaded module whose path merely ends with the breakpoint
+  # path doesn't take precedence over the module found through sys.path.
+  def testSearchUsingSysPathOrderWithLoadedSuffixMatch(self):
+    # Package that is not on sys.path directly, with a module of the same name.
+    test_dir = os.path.join(self._test_package_dir, 'inner5')
+    os.mkdir(test_dir)
+    with open(os.path.join(test_dir, '__init__.py'), 'w') as f:
+      pass
+    for path, value in ((test_dir, 1), (self._test_package_dir, 2)):
+      with open(os.path.join(path, 'mod5.py'), 'w') as f:
+        f.write('def DoPrint():\n')
+        f.write('  x = %s\n' % value)
+        f.write('  return x')
+
+    # Both modules are loaded, the one in the package first.
+    import inner5.mod5  # pylint: disable=g-import-not-at-top
+    import mod5  # pylint: disable=g-import-not-at-top
+
+    python_breakpoint.PythonBreakpoint(
+        dict(self._template, location={
+            'path': 'mod5.py',
+            'line': 3
+        }), self, self, None)
+
+    self.assertEqual(1, inner5.mod5.DoPrint())
+    self.assertEmpty(self._update_queue)
+
+    self.assertEqual(2, mod5.DoPrint())
+
+    self.assertEqual(set(['BP_ID']), self._completed)
+    self.assertLen(self._update_queue, 1)
+    self.assertEqual(
+        '2', self._update_queue[0]['stackFrames'][0]['locals'][0]['value'])
+
+    self.assertEmpty(imphook._import_callbacks)
+
   # Old module search algorithm rejects multiple matches. This test verifies
   # that when the new module search cannot find any match in sys.path, it
   # defers the breakpoint, and then selects the first dynamically-loaded
@@ -550,6 +607,50 @@ class PythonBreakpointTest(absltest.TestCase):
       self._update_queue = []
       self._completed = set()
 
+  def testUnknownEvent(self):
+    breakpoint = python_breakpoint.PythonBreakpoint(self._template, self, self,
+                                                    None)
+    breakpoint._BreakpointEvent(1000, None)
+    self.assertLen(self._update_queue, 1)
+    self.assertEqual(
+        {
+            'isError': True,
+            'description': {
+                'format': python_breakpoint.ERROR_UNSPECIFIED_INTERNAL_ERROR
+            }
+        }, self._update_queue[0]['status'])
+    self.assertEqual(set(['BP_ID']), self._completed)
+
+  def testSearchModuleFileCreatedLater(self):
+    self.assertEqual('search_later.py',
+                     python_breakpoint._SearchModule('search_later.py'))
+
+    path = os.path.join(self._test_package_dir, 'search_later.py')
+    open(path, 'w').close()
+    self.assertEqual(path, python_breakpoint._SearchModule('search_later.py'))
+
+  def testSearchModuleFileDeleted(self):
+    path = os.path.join(self._test_package_dir, 'search_deleted.py')
+    open(path, 'w').close()
+    self.assertEqual(path, python_breakpoint._SearchModule('search_deleted.py'))
+
+    os.remove(path)
+    self.assertEqual('search_deleted.py',
+                     python_breakpoint._SearchModule('search_deleted.py'))
+
+  def testSearchModuleSysPathChanged(self):
+    path = os.path.join(self._test_package_dir, 'search_moved.py')
+    open(path, 'w').close()
+    self.assertEqual(path, python_breakpoint._SearchModule('search_moved.py'))
+
+    other_dir = tempfile.mkdtemp('', 'package_')
+    other_path = os.path.join(other_dir, 'search_moved.py')
+    open(other_path, 'w').close()
+    sys.path.insert(0, other_dir)
+    self.addCleanup(sys.path.remove, other_dir)
+    self.assertEqual(other_path,
+                     python_breakpoint._SearchModule('search_moved.py'))
+
   def testExpirationTime(self):
     breakpoint = python_breakpoint.PythonBreakpoint(self._template, self, self,
                                                     None)
@@ -569,6 +670,15 @@ class PythonBreakpointTest(absltest.TestCase):
     self.assertEqual(
         self._base_time + timedelta(hours=24), breakpoint.GetExpirationTime())
 
+  def testExpirationTimeInvalidCreateTime(self):
+    self._template['createTime'] = 'not a timestamp'
+    breakpoint = python_breakpoint.PythonBreakpoint(self._template, self, self,
+                                                    None)
+    breakpoint.Clear()
+    self.assertEqual(
+        datetime.fromtimestamp(0) + timedelta(hours=24),
+        breakpoint.GetExpirationTime())
+
   def testExpirationTimeWithExpiresIn(self):
     definition = self._template.copy()
     definition['expires_in'] = {
@@ -579,7 +689,28 @@ class PythonBreakpointTest(absltest.TestCase):
                                                     None)
     breakpoint.Clear()
     self.assertEqual(
-        datetime(year=2015, month=1, day=2), breakpoint.GetExpirationTime())
+        datetime(year=2015, month=1, day=1, minute=5),
+        breakpoint.GetExpirationTime())
+
+  def testGetTimeFromRfc3339Str(self):
+    breakpoint = python_breakpoint.PythonBreakpoint(self._template, self, self,
+                                                    None)
+    breakpoint.Clear()
+    self.assertEqual(
+        datetime(2015, 1, 2, 3, 4, 5),
+        breakpoint.GetTimeFromRfc3339Str('2015-01-02T03:04:05Z'))
+    self.assertEqual(
+        datetime(2015, 1, 2, 3, 4, 5, 500000),
+        breakpoint.GetTimeFromRfc3339Str('2015-01-02T03:04:05.5Z'))
+    self.assertEqual(
+        datetime(2015, 1, 2, 3, 4, 5, 123456),
+        breakpoint.GetTimeFromRfc3339Str('2015-01-02T03:04:05.123456Z'))
+    for invalid in [
+        '2015-01-02', '2015-01-02T03:04:05', '2015/01/02T03:04:05Z',
+        '2015-+1-02T03:04:05Z'
+    ]:
+      with self.assertRaises(ValueError):
+        breakpoint.GetTimeFromRfc3339Str(invalid)
 
   def testExpiration(self):
     breakpoint = python_breakpoint.PythonBreakpoint(self._template, self, self,
@@ -647,6 +778,22 @@ class PythonBreakpointTest(absltest.TestCase):
         'foo/bar/baz/__in it__.py',
         python_breakpoint._NormalizePath('/foo/bar/baz/__in it__.py'))
 
+  def testHasPyExtension(self):
+    for path in ['a.py', 'a/b.py', 'a..py', '.a.py']:
+      self.assertTrue(python_breakpoint._HasPyExtension(path), path)
+    for path in ['a.pyc', 'a', '.py', 'a/.py', '..py', 'a.py/b']:
+      self.assertFalse(python_breakpoint._HasPyExtension(path), path)
+
+  def testStripCommonPathPrefix(self):
+    self.assertEqual(['bb1/x.py', 'bb2/x.py'],
+                     python_breakpoint._StripCommonPathPrefix(
+                         ['/aa/bb1/x.py', '/aa/bb2/x.py']))
+    self.assertEqual(['aa/bb1/x.py', 'a/bb2/x.py'],
+                     python_breakpoint._StripCommonPathPrefix(
+                         ['/aa/bb1/x.py', '/a/bb2/x.py']))
+    self.assertEqual(['x.py', 'y.py'],
+                     python_breakpoint._StripCommonPathPrefix(['x.py', 'y.py']))
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -41,7 +41,7 @@ class YamlDataVisibilityConfigReaderTest(absltest.TestCase):
       m.return_value = StringIOOpen(data)
       config = yaml_data_visibility_config_reader.OpenAndRead()
       m.assert_called_with(
-          os.path.join(sys.path[0], 'debugger-blacklist.yaml'), 'r')
+          os.path.join(sys.path[0], 'debugger-blacklist.yaml'), 'rb')
       self.assertEqual(config.blacklist_patterns, ['bl1'])
 
   def testOpenAndReadFileNotFound(self):